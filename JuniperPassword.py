@@ -1,47 +1,29 @@
-import hashlib
 import random
 import re
 import logging
-import sys
 
 
 logger = logging.getLogger(__name__)
 
 
 ITOA64 = "./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-RND = None
 MAGIC = "$9$"
 FAMILY = ["QzF3n6/9CAtpu0O", "B1IREhcSyrleKvMW8LXx", "7N-dVbwsY2g4oaJZGUDj", "iHkq.mPf5T"]
-EXTRA = {}
-VALID = None
-CHAR_REGEX = None
-NUM_ALPHA = None
-ALPHA_NUM = None
+LETTERS = "".join(FAMILY)
 ENCODING = [ [1, 4, 32], [1, 16, 32], [1, 8, 32], [1, 64], [1, 32], [1, 4, 16, 128], [1, 32, 64] ]
 
 RND = random.SystemRandom()
 
-# Prepare EXTRA constant for use with encrypt9 method
-for fam in range(0, len(FAMILY)):
-    for c in FAMILY[fam]:
-        EXTRA[c] = 3 - fam
-        
-# Prepare VALID and CHAR_REGEX Regex pattern constants for use with decrypt9 method
-letters = ""
-for item in FAMILY:
-    letters += item
-end = "[" + letters + "]{4,}$"
-end = end.replace("-", "\\-")
-VALID = re.compile("^" + str.replace(MAGIC, "$", "\$") + end)
-CHAR_REGEX = re.compile("^" + str.replace(MAGIC, "$", "\$") + "(\\S+)")
-
-# Prepare NUM_ALPHA and ALPHA_NUM constants for use with encrypt9 method
-NUM_ALPHA = []
-for char in letters:
-    NUM_ALPHA.append(char)
-ALPHA_NUM = {}
-for num in range(0, len(NUM_ALPHA)):
-    ALPHA_NUM[NUM_ALPHA[num]] = num
+# EXTRA maps each salt character to the number of random characters following it (used by encrypt9 and decrypt9)
+EXTRA = dict((c, 3 - fam) for fam in range(len(FAMILY)) for c in FAMILY[fam])
+
+# VALID and CHAR_REGEX match a $9 password and its encoded characters (used by decrypt9)
+VALID = re.compile("^\\$9\\$[" + LETTERS.replace("-", "\\-") + "]{4,}$")
+CHAR_REGEX = re.compile("^\\$9\\$(\\S+)")
+
+# NUM_ALPHA and ALPHA_NUM map between alphabet positions and characters (used by the gap encode/decode helpers)
+NUM_ALPHA = list(LETTERS)
+ALPHA_NUM = dict((c, num) for num, c in enumerate(NUM_ALPHA))
         
 
 def encrypt1(pw):
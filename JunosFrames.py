@@ -0,0 +1,364 @@
+import array
+import re
+
+import numpy
+
+import JunosReplies
+
+
+""" CONSTANTS """
+BANDWIDTH_RE = re.compile("^\\s*(\\d+(?:\\.\\d+)?)\\s*([kmgt]?)bps", re.IGNORECASE)
+BANDWIDTH_UNITS = {"": 1, "k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9, "t": 10 ** 12}
+# Above this many possible key combinations group-by falls back to sorting instead of numpy.bincount
+BINCOUNT_LIMIT = 1 << 22
+# Above this many combinations the combined int64 key would overflow so rows of codes are grouped instead
+KEY_LIMIT = 1 << 63
+
+
+class Frame(object):
+    '''
+        Columnar table backed by NumPy arrays.  String columns are dictionary encoded: the column holds int32 codes and
+        labels[name] holds the distinct strings the codes index in to.  Numeric columns are plain NumPy arrays and
+        hold NaN where the reply had no value.
+    '''
+
+    def __init__(self, columns, labels=None):
+        self.columns = columns
+        self.labels = labels or {}
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __str__(self):
+        return "Frame(rows=" + str(len(self)) + ",columns=" + ",".join(self.names) + ")"
+
+    @property
+    def names(self):
+        return sorted(self.columns.keys())
+
+    def column(self, name):
+        '''
+            Return the raw column array (codes for dictionary encoded columns).
+        '''
+        return self.columns[name]
+
+    def values(self, name):
+        '''
+            Return a column with dictionary encoded strings decoded back to an object array.
+        '''
+        if name not in self.labels:
+            return self.columns[name]
+        return numpy.asarray(self.labels[name], dtype=object)[self.columns[name]]
+
+    def filter(self, **conditions):
+        '''
+            Return a new frame holding only rows where each named column equals the given value (label for encoded columns).
+        '''
+        mask = numpy.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            if name in self.labels:
+                if value not in self.labels[name]:
+                    mask[:] = False
+                    break
+                mask &= self.columns[name] == self.labels[name].index(value)
+            else:
+                mask &= self.columns[name] == value
+        columns = {}
+        for name, column in self.columns.items():
+            columns[name] = column[mask]
+        return Frame(columns, self.labels)
+
+    def countBy(self, *names):
+        '''
+            Count rows for each distinct combination of the named columns.  Returns a dict keyed by label (one column)
+            or tuple of labels (several columns).
+        '''
+        keys, counts = self._group(names, None)
+        return dict(zip(keys, counts.tolist()))
+
+    def sumBy(self, names, valueName):
+        '''
+            Sum valueName for each distinct combination of the named columns.  NaN values are counted as zero.
+        '''
+        if not isinstance(names, (list, tuple)):
+            names = [names]
+        weights = numpy.asarray(self.columns[valueName], dtype=numpy.float64)
+        weights = numpy.where(numpy.isnan(weights), 0.0, weights)
+        keys, sums = self._group(names, weights)
+        return dict(zip(keys, sums.tolist()))
+
+    def _group(self, names, weights):
+        if not names:
+            raise ValueError("Error: group by requires at least one column name")
+
+        # Numeric columns are encoded on the fly
+        codesList = []
+        labelsList = []
+        for name in names:
+            if name in self.labels:
+                codesList.append(self.columns[name])
+                labelsList.append(self.labels[name])
+            else:
+                uniques, codes = numpy.unique(self.columns[name], return_inverse=True)
+                codesList.append(codes)
+                labelsList.append(uniques.tolist())
+        size = 1
+        for labels in labelsList:
+            size *= max(len(labels), 1)
+
+        if size > KEY_LIMIT:
+            # Too many combinations for one int64 key: group the rows of codes directly
+            present, inverse = numpy.unique(numpy.stack(codesList, axis=1), axis=0, return_inverse=True)
+            totals = numpy.bincount(inverse.reshape(-1), weights=weights)
+            rows = present.tolist()
+        else:
+            # Build one int64 key per row from the codes of each column
+            key = numpy.zeros(len(self), dtype=numpy.int64)
+            for codes, labels in zip(codesList, labelsList):
+                key *= max(len(labels), 1)
+                key += codes
+
+            # Aggregate by key with bincount when the key space is small and by sorting otherwise
+            if size <= BINCOUNT_LIMIT:
+                counts = numpy.bincount(key, minlength=size)
+                present = numpy.nonzero(counts)[0]
+                if weights is None:
+                    totals = counts[present]
+                else:
+                    totals = numpy.bincount(key, weights=weights, minlength=size)[present]
+            else:
+                present, inverse = numpy.unique(key, return_inverse=True)
+                totals = numpy.bincount(inverse.reshape(-1), weights=weights)
+            rows = []
+            for k in present.tolist():
+                codes = []
+                for labels in reversed(labelsList):
+                    k, code = divmod(k, max(len(labels), 1))
+                    codes.append(code)
+                codes.reverse()
+                rows.append(codes)
+
+        # Decode keys back in to labels
+        result = []
+        for codes in rows:
+            parts = [labels[code] for code, labels in zip(codes, labelsList)]
+            result.append(parts[0] if len(parts) == 1 else tuple(parts))
+        return result, totals
+
+
+class FrameSet(object):
+    '''
+        A list of frames (typically one per device) treated as one table.  Frames are never copied together;
+        aggregations run per frame and the per-label results are merged.
+    '''
+
+    def __init__(self, frames=None):
+        self.frames = []
+        for frame in frames or []:
+            self.append(frame)
+
+    def __len__(self):
+        return sum(len(frame) for frame in self.frames)
+
+    def __str__(self):
+        return "FrameSet(frames=" + str(len(self.frames)) + ",rows=" + str(len(self)) + ")"
+
+    def append(self, frame):
+        if isinstance(frame, FrameSet):
+            self.frames.extend(frame.frames)
+        else:
+            self.frames.append(frame)
+
+    def filter(self, **conditions):
+        return FrameSet([frame.filter(**conditions) for frame in self.frames])
+
+    def countBy(self, *names):
+        return _merge(frame.countBy(*names) for frame in self.frames)
+
+    def sumBy(self, names, valueName):
+        return _merge(frame.sumBy(names, valueName) for frame in self.frames)
+
+
+class _Encoder(object):
+    '''
+        Accumulates a dictionary encoded string column.
+    '''
+
+    def __init__(self):
+        self.index = {}
+        self.labels = []
+        self.codes = array.array("i")
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.labels)
+            self.labels.append(value)
+        self.codes.append(code)
+
+
+class _Builder(object):
+    '''
+        Accumulates rows column by column in to compact arrays and produces a Frame.
+    '''
+
+    def __init__(self, strings, numbers):
+        self.strings = dict((name, _Encoder()) for name in strings)
+        self.numbers = dict((name, array.array(typecode)) for name, typecode in numbers)
+
+    def frame(self, host=None):
+        columns = {}
+        labels = {}
+        for name, encoder in self.strings.items():
+            columns[name] = _asArray(encoder.codes)
+            labels[name] = encoder.labels
+        for name, values in self.numbers.items():
+            columns[name] = _asArray(values)
+        frame = Frame(columns, labels)
+
+        # Host is constant per reply so it costs one label and a zeroed code array
+        if host is not None:
+            frame.columns["host"] = numpy.zeros(len(frame), dtype=numpy.int32)
+            frame.labels["host"] = [host]
+        return frame
+
+
+def routeFrame(reply, host=None):
+    '''
+        Build a Frame from a show route (get-route-information) reply with one row per route entry.  Columns are
+        host, table, prefix, prefixLength, protocol, preference, active, nextHop and interface.
+    '''
+    # Small integers are exact in float32 which keeps NaN for missing values at the size of an int32
+    builder = _Builder(["table", "prefix", "protocol", "nextHop", "interface"],
+                       [("prefixLength", "f"), ("preference", "f"), ("active", "b")])
+    table, prefix, protocol, nextHop, interface = [builder.strings[name].append for name in ["table", "prefix", "protocol", "nextHop", "interface"]]
+    prefixLength, preference, active = [builder.numbers[name].append for name in ["prefixLength", "preference", "active"]]
+
+    for routeTable in JunosReplies.parseReply(reply).iterfind("route-table"):
+        tableName = routeTable.findtext("table-name")
+        for rt in routeTable.iterfind("rt"):
+            destination = rt.findtext("rt-destination")
+            length = rt.findtext("rt-prefix-length")
+            if length is None and destination is not None and "/" in destination:
+                destination, length = destination.split("/", 1)
+            for entry in rt.iterfind("rt-entry"):
+                # Use the selected next hop if one is flagged otherwise the first one listed
+                nh = None
+                for candidate in entry.iterfind("nh"):
+                    if nh is None or candidate.find("selected-next-hop") is not None:
+                        nh = candidate
+                table(tableName)
+                prefix(destination)
+                prefixLength(_number(length))
+                protocol(entry.findtext("protocol-name"))
+                preference(_number(entry.findtext("preference")))
+                active(1 if entry.findtext("active-tag") == "*" or entry.find("current-active") is not None else 0)
+                if nh is None:
+                    nextHop(None)
+                    interface(None)
+                else:
+                    nextHop(nh.findtext("to") or nh.findtext("nh-local-interface"))
+                    interface(nh.findtext("via") or nh.findtext("nh-local-interface"))
+    return builder.frame(host)
+
+
+def routeSummaryFrame(reply, host=None):
+    '''
+        Build a Frame from a show route summary (get-route-summary-information) reply with one row per table and
+        protocol.  Columns are host, table, protocol, routeCount and activeCount.
+    '''
+    builder = _Builder(["table", "protocol"], [("routeCount", "d"), ("activeCount", "d")])
+    table, protocol = builder.strings["table"].append, builder.strings["protocol"].append
+    routeCount, activeCount = builder.numbers["routeCount"].append, builder.numbers["activeCount"].append
+
+    for routeTable in JunosReplies.parseReply(reply).iterfind("route-table"):
+        tableName = routeTable.findtext("table-name")
+        for protocols in routeTable.iterfind("protocols"):
+            table(tableName)
+            protocol(protocols.findtext("protocol-name"))
+            routeCount(_number(protocols.findtext("protocol-route-count")))
+            activeCount(_number(protocols.findtext("active-route-count")))
+    return builder.frame(host)
+
+
+def lspFrame(reply, host=None):
+    '''
+        Build a Frame from a show mpls lsp extensive (get-mpls-lsp-information) reply with one row per LSP.  Columns
+        are host, sessionType, name, source, destination, state, path, bandwidth (bps, NaN when unknown),
+        setupPriority, holdPriority and fastReroute.
+    '''
+    builder = _Builder(["sessionType", "name", "source", "destination", "state", "path"],
+                       [("bandwidth", "d"), ("setupPriority", "f"), ("holdPriority", "f"), ("fastReroute", "b")])
+    sessionType, name, source, destination, state, path = [builder.strings[n].append for n in ["sessionType", "name", "source", "destination", "state", "path"]]
+    bandwidth, setupPriority, holdPriority, fastReroute = [builder.numbers[n].append for n in ["bandwidth", "setupPriority", "holdPriority", "fastReroute"]]
+
+    for sessionGroup in JunosReplies.parseReply(reply).iterfind("rsvp-session-data"):
+        groupType = sessionGroup.findtext("session-type")
+        for session in sessionGroup.iterfind("rsvp-session"):
+            lsp = session.find("mpls-lsp")
+            if lsp is None:
+                lsp = session
+
+            # Use the active path if one is flagged otherwise the first one listed
+            lspPath = None
+            for candidate in lsp.iterfind("mpls-lsp-path"):
+                if lspPath is None or candidate.find("path-active") is not None:
+                    lspPath = candidate
+
+            sessionType(groupType)
+            name(lsp.findtext("name"))
+            source(lsp.findtext("source-address"))
+            destination(lsp.findtext("destination-address"))
+            state(lsp.findtext("lsp-state"))
+            fastReroute(1 if lsp.find("is-fastreroute") is not None else 0)
+            if lspPath is None:
+                path(None)
+                bandwidth(float("nan"))
+                setupPriority(float("nan"))
+                holdPriority(float("nan"))
+            else:
+                path(lspPath.findtext("name"))
+                bandwidth(_bandwidth(lspPath.findtext("bandwidth")))
+                setupPriority(_number(lspPath.findtext("setup-priority")))
+                holdPriority(_number(lspPath.findtext("hold-priority")))
+    return builder.frame(host)
+
+
+def concatFrames(frames):
+    '''
+        Combine frames (or frame sets) from several devices in to one FrameSet without copying column data.
+    '''
+    return FrameSet(frames)
+
+
+def _asArray(values):
+    # Wrap the array buffer directly instead of copying it element by element
+    if len(values) == 0:
+        return numpy.zeros(0, dtype=values.typecode)
+    return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def _bandwidth(text):
+    if text is None:
+        return 0.0
+    match = BANDWIDTH_RE.match(text)
+    if not match:
+        return float("nan")
+    return float(match.group(1)) * BANDWIDTH_UNITS[match.group(2).lower()]
+
+
+def _number(text):
+    try:
+        return float(int(text))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _merge(results):
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
@@ -0,0 +1,194 @@
+import bisect
+import collections
+import re
+from datetime import datetime, timedelta
+
+
+""" CONSTANTS """
+MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+# Number of trailing lines remembered to find where the previous poll stopped
+TAIL_LINES = 3
+
+LogRecord = collections.namedtuple("LogRecord", ["timestamp", "line"])
+
+
+class LogFollower(object):
+    '''
+        Follow one log file on one device.  Each poll fetches only the end of the file with "| last N" (and an optional
+        server side "| match"), finds the lines seen by the previous poll and keeps the newer lines as timestamped
+        records.  N starts at window and grows until the previous lines are found, the oldest fetched line is older
+        than the last cached record (the previous lines were rotated away or rewritten, so only later lines are kept),
+        maxWindow lines are fetched or the file turns out to be shorter.  Records are kept sorted by timestamp for
+        bisect searches even when the file holds lines slightly out of order.
+    '''
+
+    def __init__(self, timestampRe, filename="messages", match=None, window=200, maxWindow=100000, maxRecords=1000000):
+        self.timestampRe = timestampRe
+        self.filename = filename
+        self.match = match
+        self.window = window
+        self.maxWindow = maxWindow
+        self.maxRecords = maxRecords
+        self.records = []
+        self.timestamps = []
+        self.tail = None
+        # Last record in file order, which continuation lines at the start of the next poll belong to
+        self.lastRecord = None
+
+    def __str__(self):
+        return "LogFollower(filename=" + self.filename + ",match=" + str(self.match) + ",records=" + str(len(self.records)) + ")"
+
+    def command(self, count):
+        command = "show log " + self.filename
+        if self.match:
+            # The CLI cannot quote a double quote so it matches any character on the router and is filtered locally
+            command += ' | match "' + self.match.replace('"', '.') + '"'
+        return command + " | last " + str(count)
+
+    def poll(self, fetch, now=None):
+        '''
+            Fetch new lines with fetch(command) -> text, add them to the cached records and return the new records.
+        '''
+        now = now or datetime.now()
+        lastTimestamp = self.timestamps[-1] if self.timestamps else None
+        count = self.window
+        while True:
+            lines = [line for line in fetch(self.command(count)).splitlines() if line.strip()]
+            if self.match and '"' in self.match:
+                search = re.compile(self.match, re.IGNORECASE).search
+                lines = [line for line in lines if search(line)]
+            if self.tail is None:
+                new = lines
+                break
+            start = _findTail(lines, self.tail)
+            if start is not None:
+                new = lines[start:]
+                break
+            if lastTimestamp is not None and self._oldest(lines, now) < lastTimestamp:
+                # Fetched back past the previous poll but its lines are gone (rotated or rewritten): keep the newer lines
+                new = self._after(lines, lastTimestamp, now)
+                break
+            if len(lines) < count or count >= self.maxWindow:
+                # Previous lines are gone (rotated) or further back than maxWindow so every line is new
+                new = lines
+                break
+            count = min(count * 4, self.maxWindow)
+
+        if lines:
+            self.tail = lines[-TAIL_LINES:]
+
+        # Lines before the first timestamp continue the last cached record
+        lead = 0
+        while lead < len(new) and self._timestamp(new[lead], now) is None:
+            lead += 1
+        if lead and self.lastRecord is not None:
+            index = self._index(self.lastRecord)
+            self.lastRecord = LogRecord(self.lastRecord.timestamp, "\n".join([self.lastRecord.line] + new[:lead]))
+            if index is not None:
+                self.records[index] = self.lastRecord
+        records = parseLogLines(new[lead:], self.timestampRe, now)
+        for record in records:
+            if not self.timestamps or record.timestamp >= self.timestamps[-1]:
+                self.records.append(record)
+                self.timestamps.append(record.timestamp)
+            else:
+                index = bisect.bisect_right(self.timestamps, record.timestamp)
+                self.records.insert(index, record)
+                self.timestamps.insert(index, record.timestamp)
+        if records:
+            self.lastRecord = records[-1]
+        if len(self.records) > self.maxRecords:
+            del self.records[:len(self.records) - self.maxRecords]
+            del self.timestamps[:len(self.timestamps) - self.maxRecords]
+        return records
+
+    def _timestamp(self, line, now):
+        match = self.timestampRe.match(line)
+        return _parseTimestamp(match.group(0), now) if match else None
+
+    def _oldest(self, lines, now):
+        for line in lines:
+            timestamp = self._timestamp(line, now)
+            if timestamp is not None:
+                return timestamp
+        return datetime.max
+
+    def _after(self, lines, lastTimestamp, now):
+        # Lines after the last line logged before lastTimestamp, less the lines at lastTimestamp that are already cached
+        start = 0
+        for index in range(len(lines) - 1, -1, -1):
+            timestamp = self._timestamp(lines[index], now)
+            if timestamp is not None and timestamp < lastTimestamp:
+                start = index + 1
+                break
+        seen = set(record.line.split("\n", 1)[0] for record in self.search(lastTimestamp, lastTimestamp))
+        while start < len(lines) and lines[start] in seen and self._timestamp(lines[start], now) == lastTimestamp:
+            start += 1
+        return lines[start:]
+
+    def _index(self, record):
+        # Position of a cached record, None once it has been trimmed
+        for index in range(bisect.bisect_right(self.timestamps, record.timestamp) - 1, -1, -1):
+            if self.timestamps[index] != record.timestamp:
+                break
+            if self.records[index] is record:
+                return index
+        return None
+
+    def search(self, start=None, end=None, pattern=None):
+        '''
+            Return cached records with start <= timestamp <= end (either may be None) whose line matches the pattern.
+        '''
+        low = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+        high = len(self.timestamps) if end is None else bisect.bisect_right(self.timestamps, end)
+        records = self.records[low:high]
+        if pattern:
+            search = re.compile(pattern).search
+            records = [record for record in records if search(record.line)]
+        return records
+
+
+def parseLogLines(lines, timestampRe, now=None):
+    '''
+        Turn log lines in to LogRecords.  Syslog timestamps have no year so the current year is assumed, moving back a
+        year for timestamps in the future (logs spanning new year).  Lines without a timestamp continue the previous record.
+    '''
+    now = now or datetime.now()
+    records = []
+    for line in lines:
+        match = timestampRe.match(line)
+        timestamp = _parseTimestamp(match.group(0), now) if match else None
+        if timestamp is None:
+            if records:
+                records[-1] = LogRecord(records[-1].timestamp, records[-1].line + "\n" + line)
+            continue
+        records.append(LogRecord(timestamp, line))
+    return records
+
+
+def _findTail(lines, tail):
+    # Index just after the last occurrence of the tail lines, or None when they are not in lines
+    for end in range(len(lines), len(tail) - 1, -1):
+        if lines[end - len(tail):end] == tail:
+            return end
+    return None
+
+
+def _parseTimestamp(text, now):
+    fields = re.split("[ :]+", text.strip())
+    month = MONTHS.get(fields[0].lower())
+    if month is None:
+        return None
+    try:
+        day, hour, minute, second = [int(field) for field in fields[1:5]]
+    except ValueError:
+        return None
+    for year in [now.year, now.year - 1]:
+        try:
+            timestamp = datetime(year, month, day, hour, minute, second)
+        except ValueError:
+            # Feb 29 only exists in leap years
+            continue
+        if timestamp <= now + timedelta(days=1):
+            return timestamp
+    return None
@@ -1,15 +1,22 @@
 from datetime import datetime
+import os
 import re
 
-import JunosNetconfUtils
 import JuniperPassword
-import jxmlease
-from lxml import etree, objectify
 
-import paramiko
-from robot.libraries.BuiltIn import BuiltIn
 
-robot = BuiltIn()
+class _LazyBuiltIn(object):
+    """ Robot Framework BuiltIn library created on first use so importing this library does not load Robot """
+    def __init__(self):
+        self._builtIn = None
+
+    def __getattr__(self, name):
+        if self._builtIn is None:
+            from robot.libraries.BuiltIn import BuiltIn
+            self._builtIn = BuiltIn()
+        return getattr(self._builtIn, name)
+
+robot = _LazyBuiltIn()
 
 class JunosNetconf(object):
     ROBOT_LIBRARY_SCOPE = 'TEST SUITE'
@@ -20,10 +27,16 @@ class JunosNetconf(object):
 
     def __init__(self,*args):
         self._debugFlag=False
+        # Optional JunosNetconfBroker socket shared by all workers (BROKER=<path> argument or JUNOS_NETCONF_BROKER)
+        self._brokerSocket=os.environ.get("JUNOS_NETCONF_BROKER") or None
         for arg in args:
             if re.match("^DEBUG=1",arg):
                 self._debugFlag=True
+            if re.match("^BROKER=",arg):
+                self._brokerSocket=arg[len("BROKER="):] or None
         self._netconfIf={}
+        self._logFollowers={}
+        self._replyPool=None
 
 
     def Decrypt9(self,password):
@@ -34,7 +47,12 @@ class JunosNetconf(object):
         trackingKey=str((host,user,password))
         if self._netconfIf.has_key(trackingKey):
             return self._netconfIf[trackingKey]
-        ret = JunosNetconfUtils.JunosNetconf(host)
+        if self._brokerSocket is not None:
+            import JunosNetconfBroker
+            ret = JunosNetconfBroker.BrokerClient(self._brokerSocket, host)
+        else:
+            import JunosNetconfUtils
+            ret = JunosNetconfUtils.JunosNetconf(host)
         self._netconfIf[trackingKey]=ret
         ret._authenticate(user,password)
         if not ret.connected:
@@ -66,6 +84,14 @@ class JunosNetconf(object):
     def GetSshCommandJunos(self,host,user,password,command,save=None):
         if password[:3] == "$9$":
             password = JuniperPassword.decrypt9(password)
+        if self._brokerSocket is not None:
+            import JunosNetconfBroker
+            client = JunosNetconfBroker.BrokerClient(self._brokerSocket, host, user, password)
+            try:
+                return client.ssh(command)
+            finally:
+                client.dev.close()
+        import paramiko
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy)
         ssh.connect(host,username=user,password=password)
@@ -99,6 +125,48 @@ class JunosNetconf(object):
             if routeTable.find("table-name").text == tableName:
                 return int(routeTable.find("active-route-count").text)
         raise RuntimeError("Error: Routing table " + str(tableName) + " not found on host " + str(netconf.host))
+
+    def GetRouteFrameJunos(self,netconf,table=None,save=None):
+        """
+        Get show route as a columnar JunosFrames.Frame with one row per route entry.  Columns are host, table, prefix,
+        prefixLength, protocol, preference, active, nextHop and interface.
+        """
+        kwargs = {}
+        if table is not None:
+            kwargs["table"] = table
+        commandOutput = self.GetCliCommandJunos(netconf, "show route", output="xml", **kwargs)
+        import JunosFrames
+        return JunosFrames.routeFrame(commandOutput, host=netconf.host)
+
+
+    def GetRouteSummaryFrameJunos(self,netconf,save=None):
+        """
+        Get show route summary as a columnar JunosFrames.Frame with one row per table and protocol.  Columns are host,
+        table, protocol, routeCount and activeCount.
+        """
+        commandOutput = self.GetCliCommandJunos(netconf, "show route summary", output="xml")
+        import JunosFrames
+        return JunosFrames.routeSummaryFrame(commandOutput, host=netconf.host)
+
+
+    def GetLspFrameJunos(self,netconf,save=None):
+        """
+        Get show mpls lsp extensive as a columnar JunosFrames.Frame with one row per LSP.  Columns are host, sessionType,
+        name, source, destination, state, path, bandwidth (bps), setupPriority, holdPriority and fastReroute.
+        """
+        commandOutput = self.GetCliCommandJunos(netconf, "show mpls lsp", output="xml", level="extensive")
+        import JunosFrames
+        return JunosFrames.lspFrame(commandOutput, host=netconf.host)
+
+
+    def ConcatFramesJunos(self,*frames):
+        """
+        Combine frames from several devices in to one JunosFrames.FrameSet without copying.  Use countBy and sumBy on the
+        result for fleet-wide aggregations.
+        """
+        import JunosFrames
+        return JunosFrames.concatFrames(frames)
+
         
     def VerifyLspJunos(self,netconf,lspName,save=None,**kwargs):
         """
@@ -146,6 +214,100 @@ class JunosNetconf(object):
         robot.log("\n### Verified {!s} of {!s} LSPs on the PCC at {!s}".format(validated,len(lspNameList),netconf.host),console=True)
         return validated
           
+    def VerifyBulkLspParallelJunos(self,netconfList,lspNameList,processes=None,save=None,**kwargs):
+        """
+        Verify a list of LSPs on many devices.  Raw replies are parsed and checked in the library's JunosReplyPool of
+        worker processes while the next device is queried, and only the per-LSP results come back.  kwargs are the same
+        as VerifyBulkLspJunos:
+
+            bandwidth
+            hold
+            setup
+            fastReroute (value is true or false as string)
+            lspType (value is external or local as string)
+
+        Returns a dict of host to the number of LSPs that were verified successfully.
+        """
+        pool = self._getReplyPool(processes)
+        try:
+            pending = []
+            for netconf in netconfList:
+                commandOutput = self.GetCliCommandJunos(netconf, "show mpls lsp", output="raw", level="extensive")
+                pending.append((netconf.host, pool.submit("lspCheck", commandOutput, lspNames=list(lspNameList), **kwargs)))
+
+            validated = {}
+            for host, result in pending:
+                failures = result.get()
+                for lspName in lspNameList:
+                    if failures[lspName] is not None:
+                        robot.log("LSP named " + lspName + " failed validation on PE " + host + ": " + failures[lspName],"ERROR")
+                validated[host] = len([lspName for lspName in lspNameList if failures[lspName] is None])
+                robot.log("\n### Verified {!s} of {!s} LSPs on the PCC at {!s}".format(validated[host],len(lspNameList),host),console=True)
+        except Exception:
+            self._terminateReplyPool()
+            raise
+        return validated
+
+
+    def GetRouteCountsParallelJunos(self,netconfList,table=None,processes=None,save=None):
+        """
+        Get show route from many devices and count route entries per (table, protocol) from the raw replies in the
+        library's JunosReplyPool of worker processes.  Returns a dict of host to {(table, protocol): count}.
+        """
+        kwargs = {}
+        if table is not None:
+            kwargs["table"] = table
+        pool = self._getReplyPool(processes)
+        try:
+            pending = []
+            for netconf in netconfList:
+                commandOutput = self.GetCliCommandJunos(netconf, "show route", output="raw", **kwargs)
+                pending.append((netconf.host, pool.submit("routeCounts", commandOutput)))
+            counts = {}
+            for host, result in pending:
+                counts[host] = result.get()
+        except Exception:
+            self._terminateReplyPool()
+            raise
+        return counts
+
+
+    def ShutReplyPoolJunos(self):
+        """
+        Stop the worker processes used by the parallel keywords (they are otherwise kept for the rest of the suite).
+        """
+        if self._replyPool is not None:
+            self._replyPool.close()
+            self._replyPool = None
+
+
+    def _getReplyPool(self,processes=None):
+        # One JunosReplyPool per library instance, started on first use and reused by later keywords.  By default the
+        # cores are shared between pabot workers instead of every worker starting one process per core.
+        if processes:
+            processes = int(processes)
+        else:
+            import multiprocessing
+            try:
+                workers = int(robot.get_variable_value("${PABOTNUMBEROFPROCESSES}", 1))
+            except (ImportError, AttributeError):
+                # Not in a Robot run (RobotNotRunningError is an AttributeError) so there are no other workers
+                workers = 1
+            processes = max(1, multiprocessing.cpu_count() // max(1, workers))
+        if self._replyPool is not None and self._replyPool.processes != processes:
+            self.ShutReplyPoolJunos()
+        if self._replyPool is None:
+            import JunosReplyPool
+            self._replyPool = JunosReplyPool.ReplyPool(processes)
+        return self._replyPool
+
+
+    def _terminateReplyPool(self):
+        # Drop queued replies after an error instead of waiting for them; the next keyword starts a new pool
+        if self._replyPool is not None:
+            self._replyPool.terminate()
+            self._replyPool = None
+
     def VerifyBgpPeeringJunos(self,netconf,neighbor,save=None):
         # Get CLI command output
         commandOutput = self.GetCliCommandJunos(netconf, "show bgp summary", output="xml")
@@ -177,15 +339,83 @@ class JunosNetconf(object):
                 else:
                     self.VerifyBgpPeeringJunos(netconf,neighbor)
     
+    def GetProcessTableJunos(self,netconf,extensive=True,save=None):
+        """
+        Get show system processes (extensive by default for CPU and memory fields) parsed in to a JunosProcesses.ProcessTable
+        indexed by command name and PID.  Uses the get-system-process-information RPC and falls back to SSH if the RPC fails.
+        """
+        import JunosProcesses
+        kwargs = {}
+        command = "show system processes"
+        if extensive:
+            kwargs["extensive"] = True
+            command += " extensive"
+        try:
+            commandOutput = self.GetCliCommandJunos(netconf, "show system processes", output="text", **kwargs)
+        except Exception as err:
+            robot.log("GetProcessTableJunos: NETCONF RPC failed (" + str(err) + "), falling back to SSH","DEBUG")
+            commandOutput = self.GetSshCommandJunos(netconf.host, netconf.username, netconf.password, command, save)
+        robot.log("GetProcessTableJunos: commandOutput:\n" + str(commandOutput),"DEBUG")
+        return JunosProcesses.parseProcessTable(commandOutput)
+
     def VerifyProcessRunningJunos(self,netconf,processName,save=None):
-        # Get process information using SSH connection as show system process has no XML RPC equivalent
-        commandOutput = self.GetSshCommandJunos(netconf.host, netconf.username, netconf.password, "show system processes", save)
-        robot.log("VerifyProcessRunningJunos: commandOutput:\n" + str(commandOutput),"DEBUG")
-        
-        # Check to see if the given process is in the output
-        if processName not in commandOutput:
+        # Match the process on its command name so rpd does not match rpd-agent (or on its command line when processName
+        # is a path or includes arguments)
+        processTable = self.GetProcessTableJunos(netconf, extensive=False, save=save)
+        if not processTable.find(processName):
             raise RuntimeError("Error: Process " + str(processName) + " is not running on Junos device " + str(netconf.host))
-        return commandOutput
+        return processTable.output
+
+    def VerifyProcessesRunningJunos(self,netconf,processList,save=None):
+        """
+        Verify a list of processes from a single process table fetch.  Each entry is a command name or glob pattern with an
+        optional minimum count, for example:
+
+            rpd
+            chassisd
+            mib2d>=1
+            sshd*>=2
+
+        Entries containing / or a space (/usr/sbin/rpd, rpd -N) are matched against the command line.
+
+        Returns the JunosProcesses.ProcessTable that was checked.
+        """
+        processTable = self.GetProcessTableJunos(netconf, save=save)
+        failures = processTable.check(processList)
+        if failures:
+            raise RuntimeError("Error: " + "; ".join(failures) + " on Junos device " + str(netconf.host))
+        robot.log("\n### Verified {!s} processes running on host {!s}".format(len(processList),netconf.host),console=True)
+        return processTable
+
+    def FollowLogJunos(self,netconf,filename="messages",match=None,save=None):
+        """
+        Return the log lines written since the previous call for this device, file and match as JunosLogs.LogRecord
+        (timestamp, line) tuples.  Only the end of the file is fetched using the router side | match and | last options,
+        and the new lines are cached for SearchLogJunos.  The first call returns the most recent lines of the file.
+        """
+        import JunosLogs
+        trackingKey=str((netconf.host,filename,match))
+        if not self._logFollowers.has_key(trackingKey):
+            self._logFollowers[trackingKey]=JunosLogs.LogFollower(self.TIMESTAMP_RE,filename,match)
+        follower = self._logFollowers[trackingKey]
+        records = follower.poll(lambda command: self.GetCliCommandJunos(netconf, command, output="cli"))
+        robot.log("FollowLogJunos: {!s} new lines in {!s} on host {!s}".format(len(records),filename,netconf.host),"DEBUG")
+        return records
+
+    def SearchLogJunos(self,netconf,pattern=None,start=None,end=None,filename="messages",match=None,save=None):
+        """
+        Fetch new log lines (see FollowLogJunos) and return the cached lines between start and end that match the regex
+        pattern.  start and end are datetime objects or strings in YYYY-MM-DD HH:MM:SS format and default to unbounded.
+        """
+        self.FollowLogJunos(netconf, filename, match)
+        follower = self._logFollowers[str((netconf.host,filename,match))]
+        records = follower.search(self._toDatetime(start), self._toDatetime(end), pattern)
+        return [record.line for record in records]
+
+    def _toDatetime(self,value):
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.strptime(str(value).split(".")[0], "%Y-%m-%d %H:%M:%S")
 
     def GetLspRroJunos(self,netconf,lspName,pathName=None,save=None,**kwargs):
         # Get CLI command output
@@ -264,77 +494,98 @@ class JunosNetconf(object):
             raise RuntimeError("Error: NETCONF commit op failed with " + result['result'] + " on host " + netconf.host)
         
         
-    def _verifyLsp(self,host,commandOutput,lspName,**kwargs):
-        # Find the right LSP and check if state is up
-        sessionGroupList = commandOutput.findall("rsvp-session-data")
-        for sessionGroup in sessionGroupList:
-            #robot.log("_verifyLsp: session-type = {!r}".format(sessionGroup.find("session-type").text),"DEBUG")
-            if sessionGroup.find("session-type") is None or sessionGroup.find("session-type").text != "Ingress":
-                continue
-            sessionList = sessionGroup.findall("rsvp-session")
-            for session in sessionList:
-                if session is None:
-                    continue
-                if session.find("mpls-lsp") is not None:
-                    lsp = session.find("mpls-lsp")
-                else:
-                    lsp = session
-                #robot.log("_verifyLsp: lsp name = {!r}".format(lsp.find("name").text),"DEBUG")
-                if lsp.find("name").text == lspName:
-                    parser = etree.XMLParser(remove_blank_text=True)
-                    contents = etree.tostring(lsp)
-                    xmlDebug = etree.fromstring(contents, parser=parser)
-                    robot.log("Verify LSP Junos: LSP XML:\n" + etree.tostring(xmlDebug, pretty_print=True, encoding="unicode"),"DEBUG")
-                    
-                    # Check values on LSP that were given in kwargs
-                    for k in ['bandwidth','setup','hold','fastReroute','lspType']:
-                        if not kwargs.has_key(k):
-                            continue
-                        errorString = ""
-                        netconfData = None
-                        if k == "bandwidth":
-                            errorString = "bandwidth"
-                            # For bandwidth = 0 then no bandwidth entry exists
-                            if lsp.find("mpls-lsp-path").find("bandwidth") is not None:
-                                netconfData = lsp.find("mpls-lsp-path").find("bandwidth").text
-                            else:
-                                netconfData = "0"
-                        elif k == "setup":
-                            errorString = "setup priority"
-                            netconfData = lsp.find("mpls-lsp-path").find("setup-priority").text
-                        elif k == "hold":
-                            errorString = "hold priority"
-                            netconfData = lsp.find("mpls-lsp-path").find("setup-priority").text
-                        elif k == "fastReroute":
-                            errorString = "fast reroute"
-                            if lsp.find("is-fastreroute") is not None:
-                                netconfData = "true"
-                            else:
-                                netconfData = "false"
-                        elif k == "lspType":
-                            errorString = "lsp type"
-                            netconfData = "local"
-                            if "Externally controlled" in lsp.find("lsp-type").text:
-                                if "Externally controlled" in lsp.find("lsp-control-status"):
-                                    netconfData = "external"
-                            
-                        #Test value and if not equal raise runtime error indicating which value failed
-                        if netconfData != kwargs[k]:
-                            robot.log("NETCONF LSP " + errorString + " response " + str(netconfData) + " does not match expected response " + str(kwargs[k]),"ERROR")
-                            return False
-                        else:
-                            if not kwargs.has_key("log") or kwargs['log'] == True:
-                                robot.log("\n### Verified LSP {!s} {!s} set to {!s}".format(lspName,errorString,netconfData),console=True)
-                     
-                    # Check LSP state   
-                    if lsp.find("lsp-state").text == "Up":
-                        return True
+    def TakeSnapshotJunos(self,netconfList,sections=None,keepFields=True,processes=None,save=None):
+        """
+        Capture operational state from each device in to a JunosSnapshot.Snapshot of normalized, hashed records.  sections
+        is a list of section names and defaults to routeSummary, bgpPeers and lsps.  Supported sections are below:
+
+            routeSummary (keyed by table name)
+            routes (keyed by prefix, grouped by table)
+            bgpPeers (keyed by peer address)
+            lsps (keyed by LSP name, grouped by session type)
+
+        Set processes to fetch raw replies and normalize and hash them in the library's JunosReplyPool of that many
+        worker processes while the next replies are fetched.
+        """
+        import JunosSnapshot
+        if not isinstance(netconfList, (list, tuple)):
+            netconfList = [netconfList]
+        snapshot = JunosSnapshot.Snapshot(keepFields=keepFields)
+        pool = self._getReplyPool(processes) if processes else None
+        try:
+            pending = []
+            for netconf in netconfList:
+                for section in sections or JunosSnapshot.DEFAULT_SECTIONS:
+                    if section not in JunosSnapshot.SECTIONS:
+                        raise RuntimeError("Error: Unknown snapshot section " + str(section))
+                    spec = JunosSnapshot.SECTIONS[section]
+                    if pool is None:
+                        commandOutput = self.GetCliCommandJunos(netconf, spec["command"], output="xml", **spec["kwargs"])
+                        snapshot.add(netconf.host, section, commandOutput)
                     else:
-                        robot.log("LSP named " + lspName + " is down on PE " + host,"ERROR")
-                        return False
-                    
-        robot.log("LSP named " + lspName + " was not found on PE " + host,"ERROR")
-        return False
+                        commandOutput = self.GetCliCommandJunos(netconf, spec["command"], output="raw", **spec["kwargs"])
+                        pending.append((netconf.host, section, pool.submit("snapshot", commandOutput, section=section, keepFields=keepFields)))
+            for host, section, result in pending:
+                snapshot.devices.setdefault(host, {})[section] = result.get()
+        except Exception:
+            if pool is not None:
+                self._terminateReplyPool()
+            raise
+        return snapshot
+
+
+    def SaveSnapshotJunos(self,snapshot,path):
+        snapshot.save(path)
+
+
+    def LoadSnapshotJunos(self,path):
+        import JunosSnapshot
+        return JunosSnapshot.Snapshot.load(path)
+
+
+    def CompareSnapshotsJunos(self,before,after,sections=None):
+        """
+        Compare two snapshots and return the list of JunosSnapshot.Change records (added, removed and changed entries).
+        Devices, sections and groups with identical hashes are skipped.
+        """
+        import JunosSnapshot
+        changes = list(JunosSnapshot.diffSnapshots(before, after, sections))
+        for change in changes:
+            robot.log(JunosSnapshot.describeChange(change))
+        robot.log("\n### Found {!s} changes between snapshots".format(len(changes)),console=True)
+        return changes
+
+
+    def VerifySnapshotsUnchangedJunos(self,before,after,sections=None):
+        changes = self.CompareSnapshotsJunos(before, after, sections)
+        if changes:
+            import JunosSnapshot
+            raise RuntimeError("Error: Snapshots differ in " + str(len(changes)) + " entries, first is " + JunosSnapshot.describeChange(changes[0]))
+
+
+    def _verifyLsp(self,host,commandOutput,lspName,**kwargs):
+        import JunosReplies
+        # Find the right LSP
+        lsp = JunosReplies.ingressLsps(commandOutput).get(lspName)
+        if lsp is None:
+            robot.log("LSP named " + lspName + " was not found on PE " + host,"ERROR")
+            return False
+
+        from lxml import etree
+        parser = etree.XMLParser(remove_blank_text=True)
+        contents = etree.tostring(lsp)
+        xmlDebug = etree.fromstring(contents, parser=parser)
+        robot.log("Verify LSP Junos: LSP XML:\n" + etree.tostring(xmlDebug, pretty_print=True, encoding="unicode"),"DEBUG")
+
+        # Check values on LSP that were given in kwargs and that the LSP is up
+        verified, failure = JunosReplies.checkLsp(lsp, **kwargs)
+        if kwargs.get("log", True) == True:
+            for name, value in verified:
+                robot.log("\n### Verified LSP {!s} {!s} set to {!s}".format(lspName,name,value),console=True)
+        if failure is not None:
+            robot.log("LSP named " + lspName + " failed validation on PE " + host + ": " + failure,"ERROR")
+            return False
+        return True
 
     def VerifyElementInXML(self, xml, element):
         """ Returns true if element exists in table 
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+"""
+Local NETCONF/SSH session broker shared by many Robot (pabot) worker processes.
+
+The broker daemon listens on a Unix domain socket and owns long-lived sessions per device.  Workers send RPC, CLI and
+SSH requests over the socket; requests for a device are queued behind a per-device session limit so a fleet-wide
+pabot run never holds more than maxSessions NETCONF and SSH sessions to one router.
+
+Start the daemon once per runner:
+
+    python JunosNetconfBroker.py --socket /tmp/junos-netconf.sock --max-sessions 4
+
+and point the library at it with the JUNOS_NETCONF_BROKER environment variable or the BROKER=<path> library argument.
+GetNetconfInterface then returns a BrokerClient which has the same op() interface as JunosNetconfUtils.JunosNetconf.
+
+Wire format is length prefixed frames (4 byte big endian length + payload).  Requests and reply headers are JSON;
+XML results are streamed after the header as raw frames terminated by an empty frame.
+"""
+
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+logger = logging.getLogger(__name__)
+
+
+""" CONSTANTS """
+DEFAULT_SOCKET = "/tmp/junos-netconf-broker.sock"
+DEFAULT_MAX_SESSIONS = 4
+CHUNK_SIZE = 64 * 1024
+CONFIG_OPS = ["merge", "override", "replace", "delete"]
+
+
+def _sendFrame(sock, payload):
+    sock.sendall(struct.pack("!I", len(payload)) + payload)
+
+
+def _recvExact(sock, length):
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(min(length - len(data), CHUNK_SIZE))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recvFrame(sock):
+    header = _recvExact(sock, 4)
+    if header is None:
+        return None
+    length = struct.unpack("!I", header)[0]
+    if length == 0:
+        return b""
+    return _recvExact(sock, length)
+
+
+def _sendMessage(sock, message):
+    _sendFrame(sock, json.dumps(message).encode("utf-8"))
+
+
+def _recvMessage(sock):
+    frame = _recvFrame(sock)
+    if frame is None:
+        return None
+    return json.loads(frame.decode("utf-8"))
+
+
+class _HostPool(object):
+    '''
+        Every session the broker holds to one device (NETCONF and SSH, any credentials).  opened counts all of them,
+        idle or in use, and never exceeds maxSessions: when the host is full an idle session of other credentials is
+        closed to make room, otherwise the request waits for a session to be released.
+    '''
+
+    def __init__(self, host, maxSessions):
+        self.host = host
+        self.maxSessions = maxSessions
+        self.cond = threading.Condition()
+        self.opened = 0
+        self.idle = {}
+        self.keyLocks = {}
+
+    def keyLock(self, key):
+        with self.cond:
+            return self.keyLocks.setdefault(key, threading.Lock())
+
+    def acquire(self, key):
+        '''
+            Return an idle session for key, or None after reserving a slot for the caller to open a new session in.
+            A caller that fails to open the session must call abandon().
+        '''
+        evicted = []
+        with self.cond:
+            while True:
+                idle = self.idle.get(key)
+                if idle:
+                    session = idle.pop()
+                    break
+                if self.opened < self.maxSessions:
+                    self.opened += 1
+                    session = None
+                    break
+                victim = self._evict()
+                if victim is not None:
+                    evicted.append(victim)
+                    self.opened -= 1
+                    continue
+                self.cond.wait()
+        for victim in evicted:
+            logger.info("Broker closing idle session to " + self.host + " to stay within " + str(self.maxSessions) + " sessions")
+            _closeSession(victim)
+        return session
+
+    def abandon(self):
+        with self.cond:
+            self.opened -= 1
+            self.cond.notify()
+
+    def release(self, key, session, broken=False):
+        with self.cond:
+            if broken:
+                self.opened -= 1
+            else:
+                self.idle.setdefault(key, []).append(session)
+            self.cond.notify()
+        if broken:
+            logger.info("Broker dropping broken session to " + self.host)
+            _closeSession(session)
+
+    def close(self):
+        with self.cond:
+            sessions = [session for idle in self.idle.values() for session in idle]
+            self.idle = {}
+            self.opened -= len(sessions)
+        for session in sessions:
+            _closeSession(session)
+
+    def _evict(self):
+        # Callers hold self.cond
+        for idle in self.idle.values():
+            if idle:
+                return idle.pop(0)
+        return None
+
+
+def _closeSession(session):
+    # NETCONF sessions are JunosNetconfUtils.JunosNetconf objects, SSH sessions are paramiko clients
+    try:
+        if hasattr(session, "dev"):
+            session.dev.close()
+        else:
+            session.close()
+    except Exception:
+        pass
+
+
+class Broker(object):
+    '''
+        Owns the device session pools and executes requests from worker connections.
+    '''
+
+    def __init__(self, maxSessions=DEFAULT_MAX_SESSIONS):
+        self.maxSessions = maxSessions
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostPool(host, self.maxSessions)
+            return self._hosts[host]
+
+    def _netconf(self, hostPool, key):
+        session = hostPool.acquire(key)
+        if session is not None:
+            return session
+        try:
+            import JunosNetconfUtils
+            session = JunosNetconfUtils.JunosNetconf(key[1])
+            session._authenticate(key[2], key[3])
+        except Exception:
+            hostPool.abandon()
+            raise
+        if not session.connected:
+            hostPool.abandon()
+            raise RuntimeError("Error: NETCONF login failed on host " + key[1])
+        logger.info("Broker opened NETCONF session to " + key[1])
+        return session
+
+    def _run(self, request, action):
+        # Run action on a pooled session and retry once on a fresh session if the pooled one was dropped by the device
+        key = ("netconf", request["host"], request.get("user"), request.get("password"))
+        hostPool = self._host(request["host"])
+        for attempt in range(0, 2):
+            session = self._netconf(hostPool, key)
+            broken = False
+            try:
+                result = action(session)
+                broken = result["status_code"] == "fail" and not session.dev.connected
+            except Exception:
+                broken = True
+                raise
+            finally:
+                hostPool.release(key, session, broken)
+            if not broken:
+                break
+        return result
+
+    def open(self, request):
+        self._run(request, lambda session: {"status_code": "success", "result": ""})
+        return {"status_code": "success", "result": ""}
+
+    def op(self, request):
+        return self._run(request, lambda session: session.op(request["op"], request.get("obj"), request.get("objParams") or [],
+                                                             *request.get("args", []), **request.get("kwargs", {})))
+
+    def commit(self, request):
+        def action(session):
+            result = session.op("configure", objParams=[request["mode"]] if request.get("mode") else [])
+            if result["status_code"] == "fail":
+                return result
+            session.mergeConfig = request.get("merge", "")
+            session.overrideConfig = request.get("override", "")
+            session.replaceConfig = request.get("replace", "")
+            return session.op("commit")
+        return self._run(request, action)
+
+    def ssh(self, request):
+        import paramiko
+        key = ("ssh", request["host"], request.get("user"), request.get("password"))
+        hostPool = self._host(request["host"])
+
+        # Logins for the same credentials are serialized by the key lock so a burst of first requests reuses the
+        # clients that are already open instead of every request logging in.  Each client holds a host slot like a
+        # NETCONF session so it counts against maxSessions, and commands run outside the lock on their own client.
+        with hostPool.keyLock(key):
+            client = hostPool.acquire(key)
+            if client is not None and (client.get_transport() is None or not client.get_transport().is_active()):
+                hostPool.release(key, client, broken=True)
+                client = hostPool.acquire(key)
+            if client is None:
+                try:
+                    client = paramiko.SSHClient()
+                    client.set_missing_host_key_policy(paramiko.AutoAddPolicy)
+                    client.connect(key[1], username=key[2], password=key[3])
+                except Exception:
+                    hostPool.abandon()
+                    raise
+                logger.info("Broker opened SSH session to " + key[1])
+        broken = True
+        try:
+            ssh_stdin, ssh_stdout, ssh_stderr = client.exec_command(request["command"])
+            result = {"status_code": "success", "result": "".join(ssh_stdout.readlines())}
+            broken = False
+        finally:
+            hostPool.release(key, client, broken)
+        return result
+
+    def handle(self, request):
+        action = request.get("action")
+        if action not in ["open", "op", "commit", "ssh"]:
+            return {"status_code": "fail", "result": "unknown broker action " + str(action)}
+        try:
+            return getattr(self, action)(request)
+        except Exception as err:
+            logger.exception("Broker " + str(action) + " request failed for host " + str(request.get("host")))
+            return {"status_code": "fail", "result": str(err)}
+
+    def close(self):
+        with self._lock:
+            for hostPool in self._hosts.values():
+                hostPool.close()
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        # A worker keeps its connection open and sends requests one after another
+        while True:
+            request = _recvMessage(self.request)
+            if request is None:
+                return
+            result = self.server.broker.handle(request)
+            body = None
+            if result["status_code"] == "success" and not isinstance(result["result"], (dict, list, str, type(u""))):
+                from lxml import etree
+                body = etree.tostring(result["result"])
+                result = {"status_code": "success", "result": None, "stream": True}
+            _sendMessage(self.request, result)
+            if body is not None:
+                for offset in range(0, len(body), CHUNK_SIZE):
+                    _sendFrame(self.request, body[offset:offset + CHUNK_SIZE])
+                _sendFrame(self.request, b"")
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socketPath=DEFAULT_SOCKET, maxSessions=DEFAULT_MAX_SESSIONS):
+        # Remove a stale socket left behind by a previous broker
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+        # Passwords travel over the socket so it is created owner-only rather than restricted after bind
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.__init__(self, socketPath, _BrokerHandler)
+        finally:
+            os.umask(umask)
+        self.socketPath = socketPath
+        self.broker = Broker(maxSessions)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        self.broker.close()
+        if os.path.exists(self.socketPath):
+            os.unlink(self.socketPath)
+
+
+class _BrokerChannel(object):
+    '''
+        One worker connection to the broker.  Used as BrokerClient.dev so ShutNetconfInterface closes the connection
+        while the broker keeps the device session open.
+    '''
+
+    def __init__(self, socketPath):
+        self.socketPath = socketPath
+        self.sock = None
+        self._lock = threading.Lock()
+
+    def request(self, message):
+        with self._lock:
+            if self.sock is None:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(self.socketPath)
+            try:
+                _sendMessage(self.sock, message)
+                result = _recvMessage(self.sock)
+                if result is None:
+                    raise RuntimeError("Error: NETCONF broker at " + self.socketPath + " closed the connection")
+                if result.pop("stream", False):
+                    # Parse the XML reply incrementally as chunks arrive
+                    from lxml import etree
+                    parser = etree.XMLParser()
+                    while True:
+                        chunk = _recvFrame(self.sock)
+                        if not chunk:
+                            break
+                        parser.feed(chunk)
+                    result["result"] = parser.close()
+                return result
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+
+class BrokerClient(object):
+    '''
+        Drop-in replacement for JunosNetconfUtils.JunosNetconf that sends operations to the broker daemon.
+    '''
+
+    def __str__(self):
+        return "BrokerClient(host=" + self.host + ",socket=" + self.dev.socketPath + ")"
+
+    def __init__(self, socketPath, host, user=None, password=None):
+        self.host = host
+        self.username = user
+        self.password = password
+        self.connected = False
+        self.dev = _BrokerChannel(socketPath)
+        self.configMode = None
+        self.mergeConfig = ""
+        self.overrideConfig = ""
+        self.replaceConfig = ""
+
+    def _request(self, action, **kwargs):
+        kwargs.update({"action": action, "host": self.host, "user": self.username, "password": self.password})
+        return self.dev.request(kwargs)
+
+    def _authenticate(self, username, password):
+        self.username = username
+        if password:
+            self.password = password
+        result = self._request("open")
+        if result["status_code"] == "fail":
+            logger.debug("NETCONF _authenticate: broker failed to open connection with error: " + str(result["result"]))
+            return
+        self.connected = True
+
+    def op(self, op, obj=None, objParams=[], *args, **kwargs):
+        """
+          Do a NETCONF operation through the broker.  See JunosNetconfUtils.JunosNetconf.op for the supported operations.
+          Configuration changes are collected locally and sent to the broker as one request on commit.
+        """
+        if op == "configure":
+            self.mergeConfig = ""
+            self.overrideConfig = ""
+            self.replaceConfig = ""
+            self.configMode = None
+            for param in objParams:
+                if param in ['exclusive','private','dynamic','batch'] and self.configMode == None:
+                    self.configMode = param
+            return {"status_code": "success", "result": ""}
+        if op in CONFIG_OPS:
+            if op == "merge":
+                self.mergeConfig += "set " + obj + "\n"
+            if op == "override":
+                self.overrideConfig += "set " + obj + "\n"
+            if op == "replace":
+                self.replaceConfig += "set " + obj + "\n"
+            if op == "delete":
+                self.replaceConfig += "delete " + obj + "\n"
+            return {"status_code": "success", "result": ""}
+        if op == "commit":
+            return self._request("commit", mode=self.configMode, merge=self.mergeConfig, override=self.overrideConfig, replace=self.replaceConfig)
+        return self._request("op", op=op, obj=obj, objParams=list(objParams), args=list(args), kwargs=kwargs)
+
+    def ssh(self, command):
+        """
+          Run a command over the broker's shared SSH connection to the device and return the output.
+        """
+        result = self._request("ssh", command=command)
+        if result["status_code"] == "fail":
+            raise RuntimeError("Error: SSH command failed with " + str(result["result"]) + " on host " + self.host)
+        return result["result"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argParser = argparse.ArgumentParser(description="Shared NETCONF/SSH session broker for Robot Framework workers")
+    argParser.add_argument("--socket", default=os.environ.get("JUNOS_NETCONF_BROKER", DEFAULT_SOCKET), help="Unix domain socket path")
+    argParser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="maximum concurrent sessions per device")
+    argParser.add_argument("--debug", action="store_true", help="enable debug logging")
+    options = argParser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if options.debug else logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    server = BrokerServer(options.socket, options.max_sessions)
+    logger.info("Broker listening on " + options.socket + " with " + str(options.max_sessions) + " sessions per device")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,5 +1,5 @@
 import json
-from lxml import etree, objectify
+from lxml import etree
 from jnpr.junos import Device
 from jnpr.junos.exception import *
 from jnpr.junos.utils.config import Config
@@ -81,6 +81,8 @@ class JunosNetconf:
               - text         : send command to router and return output in normal human readable format
               - xml          : send command to router and return output in XML format
               - json         : send command to router and return output in JSON format
+              - cli          : send command to router as typed (including pipe options such as match and last) and return text output
+              - raw          : send command to router and return the XML reply text as received (not parsed by PyEZ, namespaces kept)
               - configure    : start a configuration change
               - merge        : merge configuration with the existing configuration
               - override     : replace the entire configuration with the provided configuration
@@ -113,12 +115,12 @@ class JunosNetconf:
             return {"status_code": "success", "result": result}
         
         # Execute the given cli command and return the requested format
-        if op in ['text','json','xml']:
+        if op in ['text','json','xml','raw']:
             # Get the RPC mapping for the given command
             rpcXml = self.dev.display_xml_rpc(obj, format="text")
             rpcLines = rpcXml.splitlines()
-            rpcCall = rpcLines[0].replace("-","_")
-            rpcCall = rpcCall[1:-1]
+            rpcName = rpcLines[0][1:-1]
+            rpcCall = rpcName.replace("-","_")
             
             for arg in args:
                 if arg == "extensive":
@@ -127,6 +129,10 @@ class JunosNetconf:
             try:
                 if op == "xml":
                     result = getattr(self.dev.rpc, rpcCall)(normalize=True,**kwargs)
+                elif op == "raw":
+                    # Send through the ncclient manager so PyEZ does not normalize and rebuild the reply (ncclient still
+                    # parses it once to check for rpc-error) and return the reply text it received
+                    result = self.dev._conn.rpc(self._rpcElement(rpcName, kwargs)).xml
                 else:
                     result = getattr(self.dev.rpc, rpcCall)({'format':op},**kwargs)
             except Exception as err:
@@ -147,9 +153,28 @@ class JunosNetconf:
                     logger.debug("NETCONF op: CLI command returned:\n" + json.dumps(result, indent=4))
                 if op == "text":
                     logger.debug("NETCONF op: CLI command returned:\n" + result)
+                if op == "raw":
+                    logger.debug("NETCONF op: CLI command returned " + str(len(result)) + " characters of raw XML")
             
             return {"status_code": "success", "result": result}
         
+        # Execute the given cli command as typed so pipe options are applied by the router and return the text output
+        if op == "cli":
+            try:
+                result = self.dev.rpc.cli(obj, format="text")
+            except Exception as err:
+                return {"status_code": "fail", "result": err.message}
+
+            # An empty reply comes back as True instead of an output element
+            if isinstance(result, bool) or result.text is None:
+                result = ""
+            else:
+                result = result.text.strip()
+            if not kwargs.has_key("noDebug") or kwargs['noDebug'] is False:
+                logger.debug("NETCONF op: CLI command returned:\n" + result)
+
+            return {"status_code": "success", "result": result}
+
         # Start a configuration change by setting up class variables (configuration changes are started and committed in one atomic operation on the router through the commit operation)    
         if op == "configure":
             self.mergeConfig = ""
@@ -221,6 +246,17 @@ class JunosNetconf:
 
         return {"status_code": "success", "result": ""}
 
+    def _rpcElement(self, rpcName, kwargs):
+        # Build the RPC the same way PyEZ does for dev.rpc.<name>(**kwargs): True values are empty flags
+        rpc = etree.Element(rpcName)
+        for key, value in kwargs.items():
+            if key == "noDebug" or value is False:
+                continue
+            arg = etree.SubElement(rpc, key.replace("_","-"))
+            if value is not True:
+                arg.text = str(value)
+        return rpc
+
 def __testMe():
      pass
 #     pcsIp = '172.25.157.239'
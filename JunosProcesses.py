@@ -0,0 +1,180 @@
+import collections
+import fnmatch
+import os
+import re
+
+
+""" CONSTANTS """
+SIZE_RE = re.compile("^(\\d+(?:\\.\\d+)?)([KMGT]?)B?$", re.IGNORECASE)
+SIZE_UNITS = {"": 1024, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+THREAD_RE = re.compile("\\{[^{}]*\\}$")
+SPEC_RE = re.compile("^\\s*(.+?)\\s*(?:>=\\s*(\\d+))?\\s*$")
+
+# Header names used by show system processes (ps) and show system processes extensive (top) for each field
+USER_COLUMNS = ["USERNAME", "USER"]
+THREAD_COLUMNS = ["THR"]
+STATE_COLUMNS = ["STATE", "STAT"]
+TIME_COLUMNS = ["TIME"]
+CPU_COLUMNS = ["WCPU", "%CPU"]
+SIZE_COLUMNS = ["SIZE", "VSZ"]
+RESIDENT_COLUMNS = ["RES", "RSS"]
+MEMORY_COLUMNS = ["%MEM"]
+
+Process = collections.namedtuple("Process", ["pid", "name", "command", "user", "state", "threads", "time", "cpu", "size", "resident", "memory"])
+
+
+class ProcessTable(object):
+    '''
+        Parsed show system processes output indexed by command name and PID.  cpu and memory are percentages, size and
+        resident are bytes, and fields the output format does not include are None.
+
+        Extensive output lists one row per thread with the same PID.  rows keeps every row while processes, byName and
+        byPid hold one entry per PID with cpu summed over its threads, so counts are process counts.
+    '''
+
+    def __init__(self, processes, output=""):
+        self.rows = processes
+        self.output = output
+        self.processes = []
+        self.byName = {}
+        self.byPid = {}
+        for process in processes:
+            first = self.byPid.get(process.pid)
+            if first is None:
+                self.byPid[process.pid] = process
+                self.processes.append(process)
+                continue
+            # Another thread of a process already seen
+            threads = (first.threads or 1) + 1 if process.threads is None else first.threads
+            cpu = first.cpu if process.cpu is None else (first.cpu or 0.0) + process.cpu
+            self.byPid[process.pid] = first._replace(threads=threads, cpu=cpu)
+        self.processes = [self.byPid[process.pid] for process in self.processes]
+        for process in self.processes:
+            self.byName.setdefault(process.name, []).append(process)
+
+    def __len__(self):
+        return len(self.processes)
+
+    def __str__(self):
+        return "ProcessTable(processes=" + str(len(self.processes)) + ",names=" + str(len(self.byName)) + ")"
+
+    def find(self, pattern):
+        '''
+            Return processes whose command name equals pattern, or matches it as a glob when it contains *, ? or [.
+            Patterns containing / or a space are matched against the command line instead, either in full or with the
+            program's directory left out, and may stop at any argument: "/usr/sbin/rpd", "rpd -N" and
+            "/usr/sbin/rpd -N" all match "/usr/sbin/rpd -N".
+        '''
+        if "/" in pattern or " " in pattern:
+            return [process for process in self.processes if _matchesCommand(process.command, pattern)]
+        if not any(c in pattern for c in "*?["):
+            return list(self.byName.get(pattern, []))
+        result = []
+        for name in fnmatch.filter(self.byName.keys(), pattern):
+            result.extend(self.byName[name])
+        return result
+
+    def check(self, specs):
+        '''
+            Check each spec ("name" or "name>=count", name may be a glob) against the table and return a list of
+            failure messages (empty when every spec is satisfied).
+        '''
+        failures = []
+        for spec in specs:
+            pattern, minimum = parseSpec(spec)
+            found = len(self.find(pattern))
+            if found < minimum:
+                failures.append("process " + pattern + " has " + str(found) + " running, expected at least " + str(minimum))
+        return failures
+
+
+def parseSpec(spec):
+    match = SPEC_RE.match(spec)
+    if not match:
+        raise ValueError("Error: Invalid process spec " + repr(spec))
+    return match.group(1), int(match.group(2) or 1)
+
+
+def parseProcessTable(output):
+    '''
+        Parse show system processes output in either the ps layout (PID TT STAT TIME COMMAND) or the extensive top
+        layout (PID USERNAME THR PRI NICE SIZE RES STATE TIME WCPU COMMAND) in to a ProcessTable.
+    '''
+    processes = []
+    header = None
+    for line in output.splitlines():
+        fields = line.split()
+        if header is None:
+            # Skip the top summary lines until the column header
+            if "PID" in fields and fields[-1] == "COMMAND":
+                header = fields
+            continue
+        values = line.split(None, len(header) - 1)
+        if len(values) < len(header) or not values[header.index("PID")].isdigit():
+            continue
+        row = dict(zip(header, values))
+        command = row["COMMAND"].strip()
+        processes.append(Process(
+            pid=int(row["PID"]),
+            name=_commandName(command),
+            command=command,
+            user=_column(row, USER_COLUMNS),
+            state=_column(row, STATE_COLUMNS),
+            threads=_number(_column(row, THREAD_COLUMNS), int),
+            time=_column(row, TIME_COLUMNS),
+            cpu=_number(_column(row, CPU_COLUMNS), float),
+            size=_size(_column(row, SIZE_COLUMNS)),
+            resident=_size(_column(row, RESIDENT_COLUMNS)),
+            memory=_number(_column(row, MEMORY_COLUMNS), float)))
+    return ProcessTable(processes, output)
+
+
+def _column(row, names):
+    for name in names:
+        if name in row:
+            return row[name]
+    return None
+
+
+def _commandName(command):
+    # "/usr/sbin/rpd -N" -> rpd, "[idle]" -> idle, "sshd: root@pts/0" -> sshd, "idle{idle: cpu1}" -> idle
+    command = THREAD_RE.sub("", command)
+    name = command.split()[0] if command else ""
+    if name.startswith("[") and command.endswith("]"):
+        return command[1:-1].split()[0] if len(command) > 2 else ""
+    return os.path.basename(name).rstrip(":")
+
+
+def _matchesCommand(command, pattern):
+    command = THREAD_RE.sub("", command)
+    fields = command.split(None, 1)
+    if not fields:
+        return False
+    short = " ".join([os.path.basename(fields[0])] + fields[1:])
+    glob = any(c in pattern for c in "*?[")
+    for form in [command, short]:
+        if glob and fnmatch.fnmatchcase(form, pattern):
+            return True
+        # The pattern has to end at an argument boundary ("sshd: root@pts/0" is how sshd sets its title)
+        if form.startswith(pattern) and form[len(pattern):len(pattern) + 1] in ["", " ", ":"]:
+            return True
+    return False
+
+
+def _number(text, kind):
+    if text is None:
+        return None
+    try:
+        return kind(text.rstrip("%"))
+    except ValueError:
+        return None
+
+
+def _size(text):
+    # top prints sizes with a K/M/G suffix while ps prints plain kilobytes
+    if text is None:
+        return None
+    match = SIZE_RE.match(text)
+    if not match:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
@@ -0,0 +1,85 @@
+from lxml import etree
+
+
+""" CONSTANTS """
+# LSP values that can be checked, in the order they are checked, with the name used in log messages
+LSP_CHECKS = [("bandwidth", "bandwidth"), ("setup", "setup priority"), ("hold", "hold priority"),
+              ("fastReroute", "fast reroute"), ("lspType", "lsp type")]
+
+
+def parseReply(reply):
+    '''
+        Accept an lxml element or raw reply bytes/text and return the reply root without the rpc-reply wrapper.  Raw
+        replies (as sent by the router, see the raw op in JunosNetconfUtils) get what PyEZ normalize would have done:
+        namespaces are stripped and whitespace in text is normalized, so they compare equal to normalized replies.
+    '''
+    if isinstance(reply, (bytes, str)) or not hasattr(reply, "iterfind"):
+        if not isinstance(reply, bytes):
+            reply = reply.encode("utf-8")
+        reply = etree.fromstring(reply, parser=etree.XMLParser(remove_blank_text=True, huge_tree=True))
+        # Strip from the document root so no namespace declarations are left on the rpc-reply wrapper
+        for element in reply.iter(tag=etree.Element):
+            if element.tag[0] == "{":
+                element.tag = element.tag.split("}", 1)[1]
+            if element.text:
+                element.text = " ".join(element.text.split())
+        etree.cleanup_namespaces(reply)
+    if reply.tag == "rpc-reply" and len(reply):
+        reply = reply[0]
+    return reply
+
+
+def ingressLsps(root):
+    '''
+        Ingress LSP elements from a show mpls lsp extensive reply by name (the first one when a name repeats).
+    '''
+    lsps = {}
+    for sessionGroup in root.iterfind("rsvp-session-data"):
+        if sessionGroup.findtext("session-type") != "Ingress":
+            continue
+        for session in sessionGroup.iterfind("rsvp-session"):
+            lsp = session.find("mpls-lsp")
+            if lsp is None:
+                lsp = session
+            lsps.setdefault(lsp.findtext("name"), lsp)
+    return lsps
+
+
+def lspValue(lsp, check):
+    '''
+        Value of one of the LSP_CHECKS on an LSP element as the string the VerifyLsp keywords compare against.
+    '''
+    path = lsp.find("mpls-lsp-path")
+    if check == "bandwidth":
+        # For bandwidth = 0 then no bandwidth entry exists
+        return path.findtext("bandwidth", "0") if path is not None else "0"
+    if check == "setup":
+        return path.findtext("setup-priority") if path is not None else None
+    if check == "hold":
+        return path.findtext("hold-priority") if path is not None else None
+    if check == "fastReroute":
+        return "true" if lsp.find("is-fastreroute") is not None else "false"
+    if check == "lspType":
+        if "Externally controlled" in (lsp.findtext("lsp-type") or "") and "Externally controlled" in (lsp.findtext("lsp-control-status") or ""):
+            return "external"
+        return "local"
+    raise ValueError("Error: Unknown LSP check " + str(check))
+
+
+def checkLsp(lsp, **kwargs):
+    '''
+        Compare an LSP element with the expected values in kwargs (bandwidth, setup, hold, fastReroute and lspType),
+        stopping at the first mismatch, then check that the LSP is up.  Returns (verified, failure) where verified is the
+        list of (name, value) pairs that matched and failure is None or the reason the LSP failed.
+    '''
+    verified = []
+    for check, name in LSP_CHECKS:
+        if check not in kwargs:
+            continue
+        value = lspValue(lsp, check)
+        if value != kwargs[check]:
+            return verified, name + " is " + str(value) + ", expected " + str(kwargs[check])
+        verified.append((name, value))
+    if lsp.findtext("lsp-state") != "Up":
+        return verified, "state is " + str(lsp.findtext("lsp-state"))
+    return verified, None
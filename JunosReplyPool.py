@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from lxml import etree
+
+import JunosReplies
+
+
+""" CONSTANTS """
+# Replies are handed to workers as files on tmpfs so the reply bytes never go through the pool's pickling pipes
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def routeCountsTask(root):
+    '''
+        Route entry counts per (table, protocol) from a show route reply.
+    '''
+    import JunosFrames
+    return JunosFrames.routeFrame(root).countBy("table", "protocol")
+
+
+def lspCheckTask(root, lspNames, **kwargs):
+    '''
+        Check LSPs from a show mpls lsp extensive reply with JunosReplies.checkLsp.  Returns {lspName: None} for LSPs
+        that are up and match every expected value, or {lspName: reason} for the rest.  Supported kwargs are the
+        VerifyLspJunos ones (bandwidth, setup, hold, fastReroute and lspType).
+    '''
+    lsps = JunosReplies.ingressLsps(root)
+    result = {}
+    for lspName in lspNames:
+        if lspName not in lsps:
+            result[lspName] = "not found"
+        else:
+            result[lspName] = JunosReplies.checkLsp(lsps[lspName], **kwargs)[1]
+    return result
+
+
+def snapshotTask(root, section, ignore=None, keepFields=True):
+    '''
+        Normalized, hashed records for one JunosSnapshot section (the value stored in Snapshot.devices[host][section]).
+    '''
+    import JunosSnapshot
+    return JunosSnapshot.buildSection(section, root, ignore, keepFields)
+
+
+TASKS = {
+    "routeCounts": routeCountsTask,
+    "lspCheck": lspCheckTask,
+    "snapshot": snapshotTask,
+}
+
+
+def _runTask(task, path, kwargs):
+    # Runs in a worker: parse the reply straight from the shared file and return only the compact task result
+    with open(path, "rb") as handle:
+        root = JunosReplies.parseReply(handle.read())
+    return TASKS[task](root, **kwargs)
+
+
+def _context():
+    # Workers are started from a fork server (or spawned) where available rather than forked from a process that has
+    # live ncclient/paramiko threads.  They import this module by name so its directory must be on sys.path even when
+    # Robot imported the library by file path.
+    if MODULE_DIR not in sys.path:
+        sys.path.append(MODULE_DIR)
+    if not hasattr(multiprocessing, "get_context"):
+        return multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class _PendingResult(object):
+
+    def __init__(self, asyncResult, path, paths):
+        self.asyncResult = asyncResult
+        self.path = path
+        self.paths = paths
+
+    def get(self, timeout=None):
+        try:
+            return self.asyncResult.get(timeout)
+        finally:
+            _unlink(self.paths, self.path)
+
+
+def _unlink(paths, path):
+    paths.discard(path)
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+class ReplyPool(object):
+    '''
+        Process pool that parses and checks RPC replies on every core.  The main process writes each reply once to a
+        tmpfs file (raw reply bytes as received, or lxml elements serialized in C without walking them in Python), a
+        worker parses it from there and runs the named task from TASKS, and only the small task result is sent back.
+        A pool is meant to be kept and reused: close() waits for queued tasks, terminate() drops them, and both delete
+        the reply files that are still on tmpfs.
+    '''
+
+    def __init__(self, processes=None):
+        self.processes = processes
+        self.paths = set()
+        self.pool = _context().Pool(processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, *exc):
+        if excType is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def submit(self, task, reply, **kwargs):
+        '''
+            Queue task for reply (lxml element, or raw reply bytes/text).  Returns an object whose get() waits for and
+            returns the task result.
+        '''
+        if task not in TASKS:
+            raise ValueError("Error: Unknown reply pool task " + str(task))
+        handle, path = tempfile.mkstemp(prefix="junos-reply-", suffix=".xml", dir=SHARED_DIR)
+        self.paths.add(path)
+        try:
+            with os.fdopen(handle, "wb") as output:
+                if hasattr(reply, "tag"):
+                    etree.ElementTree(reply).write(output)
+                else:
+                    output.write(reply if isinstance(reply, bytes) else reply.encode("utf-8"))
+            return _PendingResult(self.pool.apply_async(_runTask, (task, path, kwargs)), path, self.paths)
+        except Exception:
+            _unlink(self.paths, path)
+            raise
+
+    def map(self, task, replies, **kwargs):
+        '''
+            Run task over every reply in parallel and return the results in the same order.
+        '''
+        pending = [self.submit(task, reply, **kwargs) for reply in replies]
+        return [result.get() for result in pending]
+
+    def close(self):
+        try:
+            self.pool.close()
+            self.pool.join()
+        finally:
+            self._cleanup()
+
+    def terminate(self):
+        try:
+            self.pool.terminate()
+            self.pool.join()
+        finally:
+            self._cleanup()
+
+    def _cleanup(self):
+        # Replies whose results were never collected
+        for path in list(self.paths):
+            _unlink(self.paths, path)
@@ -0,0 +1,226 @@
+import collections
+import gzip
+import hashlib
+import json
+
+
+""" CONSTANTS """
+HASH_MASK = (1 << 64) - 1
+
+# Operational state that can be captured.  Each section maps to the CLI command (and RPC kwargs) used to fetch it, the
+# function that splits the reply in to (group, key, element) records and the leaf tags ignored because they change on
+# every poll.  Groups are the subtrees that get their own hash so unchanged groups are skipped when diffing.
+SECTIONS = {
+    "routeSummary": {"command": "show route summary", "kwargs": {}, "ignore": []},
+    "routes": {"command": "show route", "kwargs": {}, "ignore": ["age"]},
+    "bgpPeers": {"command": "show bgp summary", "kwargs": {},
+                 "ignore": ["elapsed-time", "input-messages", "output-messages", "route-queue-count"]},
+    "lsps": {"command": "show mpls lsp", "kwargs": {"level": "extensive"},
+             "ignore": ["lsp-creation-time", "lsp-path-history", "packet-information"]},
+}
+DEFAULT_SECTIONS = ["routeSummary", "bgpPeers", "lsps"]
+
+Change = collections.namedtuple("Change", ["host", "section", "group", "key", "change", "before", "after"])
+
+
+def _routeSummaryRecords(root):
+    for routeTable in root.iterfind("route-table"):
+        yield "", routeTable.findtext("table-name"), routeTable
+
+
+def _routeRecords(root):
+    for routeTable in root.iterfind("route-table"):
+        tableName = routeTable.findtext("table-name")
+        for rt in routeTable.iterfind("rt"):
+            yield tableName, rt.findtext("rt-destination"), rt
+
+
+def _bgpPeerRecords(root):
+    for bgpPeer in root.iterfind("bgp-peer"):
+        yield "", bgpPeer.findtext("peer-address"), bgpPeer
+
+
+def _lspRecords(root):
+    for sessionGroup in root.iterfind("rsvp-session-data"):
+        sessionType = sessionGroup.findtext("session-type")
+        for session in sessionGroup.iterfind("rsvp-session"):
+            lsp = session.find("mpls-lsp")
+            if lsp is None:
+                lsp = session
+            yield sessionType, lsp.findtext("name"), lsp
+
+
+SECTIONS["routeSummary"]["records"] = _routeSummaryRecords
+SECTIONS["routes"]["records"] = _routeRecords
+SECTIONS["bgpPeers"]["records"] = _bgpPeerRecords
+SECTIONS["lsps"]["records"] = _lspRecords
+
+
+class Snapshot(object):
+    '''
+        Normalized, hashed operational state for a set of devices.
+
+        devices[host][section][group] = {"hash": groupHash, "records": {key: [recordHash, fields]}}
+
+        fields is a sorted list of [path, text] pairs for every leaf under the record (None when the snapshot was taken
+        with keepFields=False, in which case diffs report changed keys only).
+    '''
+
+    def __init__(self, devices=None, keepFields=True):
+        self.devices = devices or {}
+        self.keepFields = keepFields
+
+    def __str__(self):
+        records = 0
+        for sections in self.devices.values():
+            for groups in sections.values():
+                for group in groups.values():
+                    records += len(group["records"])
+        return "Snapshot(devices=" + str(len(self.devices)) + ",records=" + str(records) + ")"
+
+    def add(self, host, section, reply, ignore=None):
+        '''
+            Normalize and hash an RPC reply (lxml element) for one device in to the named section.
+        '''
+        self.devices.setdefault(host, {})[section] = buildSection(section, reply, ignore, self.keepFields)
+
+    def sectionHash(self, host, section):
+        groups = self.devices.get(host, {}).get(section)
+        if groups is None:
+            return None
+        return _digest(sorted([group, value["hash"]] for group, value in groups.items()))
+
+    def deviceHash(self, host):
+        sections = self.devices.get(host)
+        if sections is None:
+            return None
+        return _digest(sorted([section, self.sectionHash(host, section)] for section in sections))
+
+    def save(self, path):
+        '''
+            Write the snapshot as gzipped JSON.
+        '''
+        with gzip.open(path, "wb") as handle:
+            handle.write(json.dumps({"keepFields": self.keepFields, "devices": self.devices}, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rb") as handle:
+            data = json.loads(handle.read().decode("utf-8"))
+        return cls(data["devices"], data["keepFields"])
+
+
+def buildSection(section, reply, ignore=None, keepFields=True):
+    '''
+        Normalize and hash an RPC reply in to the {group: {"hash": ..., "records": ...}} layout stored per section.
+        Kept separate from Snapshot.add so replies can be processed in worker processes (see JunosReplyPool).
+    '''
+    spec = SECTIONS[section]
+    ignore = set(spec["ignore"] if ignore is None else ignore)
+    groups = {}
+    for group, key, element in spec["records"](reply):
+        group = group or ""
+        records = groups.setdefault(group, {})
+        key = _uniqueKey(records, key or "")
+        fields = _normalize(element, ignore)
+        records[key] = [_digest([key, fields]), fields if keepFields else None]
+
+    # Group hashes are an order independent sum of record hashes so they are built in one pass
+    result = {}
+    for group, records in groups.items():
+        total = len(records)
+        for recordHash, fields in records.values():
+            total = (total + int(recordHash, 16)) & HASH_MASK
+        result[group] = {"hash": "%016x" % total, "records": records}
+    return result
+
+
+def diffSnapshots(before, after, sections=None):
+    '''
+        Generate Change records for entries added, removed or changed between two snapshots.  Devices, sections and
+        groups with equal hashes are skipped without looking at their records, and records are matched by key so the
+        diff is linear in the number of records that are compared.
+    '''
+    for host in _union(before.devices, after.devices):
+        if before.deviceHash(host) == after.deviceHash(host):
+            continue
+        beforeSections = before.devices.get(host, {})
+        afterSections = after.devices.get(host, {})
+        for section in _union(beforeSections, afterSections):
+            if sections is not None and section not in sections:
+                continue
+            if before.sectionHash(host, section) == after.sectionHash(host, section):
+                continue
+            beforeGroups = beforeSections.get(section, {})
+            afterGroups = afterSections.get(section, {})
+            for group in _union(beforeGroups, afterGroups):
+                beforeGroup = beforeGroups.get(group, {"hash": None, "records": {}})
+                afterGroup = afterGroups.get(group, {"hash": None, "records": {}})
+                if beforeGroup["hash"] == afterGroup["hash"]:
+                    continue
+                beforeRecords = beforeGroup["records"]
+                afterRecords = afterGroup["records"]
+                for key, record in beforeRecords.items():
+                    if key not in afterRecords:
+                        yield Change(host, section, group, key, "removed", record[1], None)
+                    elif afterRecords[key][0] != record[0]:
+                        yield Change(host, section, group, key, "changed", record[1], afterRecords[key][1])
+                for key, record in afterRecords.items():
+                    if key not in beforeRecords:
+                        yield Change(host, section, group, key, "added", None, record[1])
+
+
+def describeChange(change):
+    '''
+        One line description of a Change including the fields that differ.
+    '''
+    text = change.change + " " + change.section + " " + change.key
+    if change.group:
+        text += " (" + change.group + ")"
+    text += " on host " + change.host
+    if change.change == "changed" and change.before is not None and change.after is not None:
+        beforeFields = set(tuple(field) for field in change.before)
+        afterFields = set(tuple(field) for field in change.after)
+        removed = ["{!s}={!s}".format(path, value) for path, value in sorted(beforeFields - afterFields)]
+        added = ["{!s}={!s}".format(path, value) for path, value in sorted(afterFields - beforeFields)]
+        text += ": " + ", ".join(removed) + " -> " + ", ".join(added)
+    return text
+
+
+def _digest(value):
+    # Hash a canonical JSON encoding so str and unicode (Python 2, or values read back by Snapshot.load) hash the same
+    return hashlib.sha1(json.dumps(value, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(element, ignore, prefix=""):
+    fields = []
+    _flatten(element, ignore, prefix, fields)
+    fields.sort()
+    return fields
+
+
+def _flatten(element, ignore, prefix, fields):
+    for child in element:
+        if not isinstance(child.tag, str) or child.tag in ignore:
+            continue
+        path = prefix + child.tag
+        if len(child):
+            _flatten(child, ignore, path + "/", fields)
+        else:
+            fields.append([path, (child.text or "").strip()])
+
+
+def _union(first, second):
+    keys = list(first)
+    keys.extend(key for key in second if key not in first)
+    return keys
+
+
+def _uniqueKey(records, key):
+    # Keys such as transit LSP names can repeat within a group so later duplicates get a numbered suffix
+    if key not in records:
+        return key
+    count = 2
+    while key + "#" + str(count) in records:
+        count += 1
+    return key + "#" + str(count)
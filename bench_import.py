@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Cold-start import benchmark for the Robot libraries.  Each import runs in a fresh interpreter so nothing is cached
+between runs, and the heavy dependencies that the import pulled in are reported alongside the timing.
+
+    python bench_import.py [runs] [module ...]
+"""
+
+import subprocess
+import sys
+
+
+MODULES = ["JuniperPassword", "JunosNetconf", "JunosFrames", "JunosNetconfUtils"]
+HEAVY = ["robot", "paramiko", "jxmlease", "lxml", "jnpr", "numpy"]
+SNIPPET = """
+import sys, time
+start = time.time()
+import {0}
+elapsed = time.time() - start
+print(repr(elapsed) + " " + ",".join(sorted(set(m.split(".")[0] for m in sys.modules if m.split(".")[0] in {1!r}))))
+"""
+
+
+def coldImport(module, runs):
+    timings = []
+    loaded = ""
+    for run in range(0, runs):
+        proc = subprocess.Popen([sys.executable, "-c", SNIPPET.format(module, HEAVY)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            return None, err.decode("utf-8", "replace").strip().splitlines()[-1]
+        fields = out.decode("utf-8").split()
+        timings.append(float(fields[0]))
+        loaded = fields[1] if len(fields) > 1 else "-"
+    return sorted(timings), loaded
+
+
+if __name__ == '__main__':
+    runs = 10
+    modules = MODULES
+    if len(sys.argv) > 1:
+        runs = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        modules = sys.argv[2:]
+
+    print("{:<20} {:>10} {:>10}  {}".format("module", "min ms", "median ms", "heavy modules loaded"))
+    for module in modules:
+        timings, loaded = coldImport(module, runs)
+        if timings is None:
+            print("{:<20} {:>10} {:>10}  {}".format(module, "-", "-", "import failed: " + loaded))
+            continue
+        print("{:<20} {:>10.2f} {:>10.2f}  {}".format(module, timings[0] * 1000, timings[len(timings) // 2] * 1000, loaded))
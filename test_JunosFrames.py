@@ -0,0 +1,129 @@
+import math
+import unittest
+
+import numpy
+
+import JunosFrames
+
+
+ROUTES = b'''<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<route-information xmlns="http://xml.juniper.net/junos/18.1R1/junos-routing">
+<route-table><table-name>inet.0</table-name>
+    <rt><rt-destination>10.1.0.0/16</rt-destination>
+        <rt-entry><active-tag>*</active-tag><protocol-name>BGP</protocol-name><preference>170</preference>
+            <nh><to>192.0.2.1</to><via>ge-0/0/0.0</via></nh>
+            <nh><selected-next-hop/><to>192.0.2.2</to><via>ge-0/0/1.0</via></nh>
+        </rt-entry>
+        <rt-entry><protocol-name>OSPF</protocol-name><preference>10</preference><nh><to>192.0.2.3</to><via>ge-0/0/2.0</via></nh></rt-entry>
+    </rt>
+    <rt><rt-destination>10.2.0.0</rt-destination><rt-prefix-length>24</rt-prefix-length>
+        <rt-entry><active-tag>*</active-tag><protocol-name>Static</protocol-name><nh><nh-local-interface>ge-0/0/3.0</nh-local-interface></nh></rt-entry>
+    </rt>
+</route-table>
+<route-table><table-name>inet.3</table-name>
+    <rt><rt-destination>192.0.2.9/32</rt-destination>
+        <rt-entry><active-tag>*</active-tag><protocol-name>RSVP</protocol-name><preference>7</preference><nh><to>192.0.2.1</to><via>ge-0/0/0.0</via></nh></rt-entry>
+    </rt>
+</route-table>
+</route-information>
+</rpc-reply>'''
+
+ROUTE_SUMMARY = b'''<route-summary-information>
+<route-table><table-name>inet.0</table-name>
+    <protocols><protocol-name>BGP</protocol-name><protocol-route-count>100</protocol-route-count><active-route-count>90</active-route-count></protocols>
+    <protocols><protocol-name>Direct</protocol-name><protocol-route-count>4</protocol-route-count></protocols>
+</route-table>
+<route-table><table-name>inet.3</table-name>
+    <protocols><protocol-name>RSVP</protocol-name><protocol-route-count>5</protocol-route-count><active-route-count>5</active-route-count></protocols>
+</route-table>
+</route-summary-information>'''
+
+LSPS = b'''<mpls-lsp-information>
+<rsvp-session-data><session-type>Ingress</session-type>
+    <rsvp-session><mpls-lsp><name>lsp1</name><source-address>10.0.0.1</source-address><destination-address>10.0.0.2</destination-address>
+        <lsp-state>Up</lsp-state><is-fastreroute/>
+        <mpls-lsp-path><name>standby</name><bandwidth>1Mbps</bandwidth><setup-priority>3</setup-priority><hold-priority>3</hold-priority></mpls-lsp-path>
+        <mpls-lsp-path><name>primary</name><path-active/><bandwidth>10Mbps</bandwidth><setup-priority>7</setup-priority><hold-priority>0</hold-priority></mpls-lsp-path>
+    </mpls-lsp></rsvp-session>
+    <rsvp-session><mpls-lsp><name>lsp2</name><lsp-state>Dn</lsp-state>
+        <mpls-lsp-path><name>primary</name><setup-priority>7</setup-priority><hold-priority>0</hold-priority></mpls-lsp-path>
+    </mpls-lsp></rsvp-session>
+    <rsvp-session><mpls-lsp><name>lsp3</name><lsp-state>Dn</lsp-state></mpls-lsp></rsvp-session>
+</rsvp-session-data>
+</mpls-lsp-information>'''
+
+
+class FrameBuildTest(unittest.TestCase):
+
+    def testRouteFrame(self):
+        frame = JunosFrames.routeFrame(ROUTES, host="r1")
+        self.assertEqual(len(frame), 4)
+        self.assertEqual(frame.values("protocol").tolist(), ["BGP", "OSPF", "Static", "RSVP"])
+        self.assertEqual(frame.values("prefix").tolist(), ["10.1.0.0", "10.1.0.0", "10.2.0.0", "192.0.2.9"])
+        self.assertEqual(frame.values("prefixLength").tolist(), [16, 16, 24, 32])
+        self.assertEqual(frame.values("nextHop").tolist(), ["192.0.2.2", "192.0.2.3", "ge-0/0/3.0", "192.0.2.1"])
+        self.assertEqual(frame.values("interface").tolist()[0], "ge-0/0/1.0")
+        self.assertEqual(frame.values("active").tolist(), [1, 0, 1, 1])
+        self.assertTrue(math.isnan(frame.values("preference")[2]))
+        self.assertEqual(frame.values("host").tolist(), ["r1"] * 4)
+
+    def testRouteSummaryFrame(self):
+        frame = JunosFrames.routeSummaryFrame(ROUTE_SUMMARY)
+        self.assertEqual(frame.countBy("table"), {"inet.0": 2, "inet.3": 1})
+        self.assertEqual(frame.sumBy("table", "routeCount"), {"inet.0": 104.0, "inet.3": 5.0})
+        self.assertEqual(frame.sumBy("table", "activeCount"), {"inet.0": 90.0, "inet.3": 5.0})
+
+    def testLspFrame(self):
+        frame = JunosFrames.lspFrame(LSPS)
+        self.assertEqual(frame.values("path").tolist(), ["primary", "primary", None])
+        self.assertEqual(frame.values("bandwidth")[0], 10 ** 7)
+        # No bandwidth on the path means none is reserved, no path means it is unknown
+        self.assertEqual(frame.values("bandwidth")[1], 0.0)
+        self.assertTrue(math.isnan(frame.values("bandwidth")[2]))
+        self.assertEqual(frame.values("setupPriority")[0], 7)
+        self.assertEqual(frame.values("holdPriority")[0], 0)
+        self.assertTrue(math.isnan(frame.values("holdPriority")[2]))
+        self.assertEqual(frame.values("fastReroute").tolist(), [1, 0, 0])
+
+
+class FrameQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = JunosFrames.routeFrame(ROUTES, host="r1")
+
+    def testFilter(self):
+        self.assertEqual(len(self.frame.filter(table="inet.0")), 3)
+        self.assertEqual(len(self.frame.filter(table="inet.0", protocol="BGP")), 1)
+        self.assertEqual(len(self.frame.filter(protocol="ISIS")), 0)
+        self.assertEqual(len(self.frame.filter(prefixLength=16)), 2)
+
+    def testCountAndSumBy(self):
+        self.assertEqual(self.frame.countBy("protocol"), {"BGP": 1, "OSPF": 1, "Static": 1, "RSVP": 1})
+        self.assertEqual(self.frame.countBy("table", "active"), {("inet.0", 0): 1, ("inet.0", 1): 2, ("inet.3", 1): 1})
+        # Missing preferences are NaN and count as zero
+        self.assertEqual(self.frame.sumBy("protocol", "preference"), {"BGP": 170.0, "OSPF": 10.0, "Static": 0.0, "RSVP": 7.0})
+        self.assertEqual(self.frame.sumBy(["table", "protocol"], "prefixLength")[("inet.0", "BGP")], 16.0)
+
+    def testGroupByBeyondInt64Keys(self):
+        # 10^5 labels in each of four columns is more combinations than an int64 key can hold
+        labels = [str(code) for code in range(10 ** 5)]
+        codes = numpy.array([0, 99999, 0, 12345], dtype=numpy.int32)
+        frame = JunosFrames.Frame(dict((name, codes) for name in "abcd"), dict((name, labels) for name in "abcd"))
+        self.assertEqual(frame.countBy("a", "b", "c", "d"), {("0", "0", "0", "0"): 2, ("99999", "99999", "99999", "99999"): 1,
+                                                             ("12345", "12345", "12345", "12345"): 1})
+
+    def testFrameSetMergesDifferentLabels(self):
+        other = JunosFrames.routeFrame(b'''<route-information><route-table><table-name>inet.0</table-name>
+            <rt><rt-destination>10.9.0.0/16</rt-destination><rt-entry><protocol-name>ISIS</protocol-name><preference>18</preference></rt-entry></rt>
+            <rt><rt-destination>10.8.0.0/16</rt-destination><rt-entry><protocol-name>BGP</protocol-name><preference>170</preference></rt-entry></rt>
+            </route-table></route-information>''', host="r2")
+        frames = JunosFrames.concatFrames([self.frame, other])
+        self.assertEqual(len(frames), 6)
+        self.assertEqual(frames.countBy("protocol"), {"BGP": 2, "OSPF": 1, "Static": 1, "RSVP": 1, "ISIS": 1})
+        self.assertEqual(frames.countBy("host", "table")[("r2", "inet.0")], 2)
+        self.assertEqual(frames.sumBy("protocol", "preference")["BGP"], 340.0)
+        self.assertEqual(len(frames.filter(protocol="ISIS")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import re
+import unittest
+from datetime import datetime
+
+import JunosLogs
+
+
+# Same pattern as JunosNetconf.TIMESTAMP_RE (importing the library module here would need Robot)
+TIMESTAMP_RE = re.compile("\\w{3} *\\d{1,2} *\\d{1,2}:\\d{1,2}:\\d{1,2}")
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+class FakeLog(object):
+    '''
+        Log file on a fake router answering "show log <file> [| match ...] | last N" and recording the commands.
+    '''
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.commands = []
+
+    def fetch(self, command):
+        self.commands.append(command)
+        lines = self.lines
+        match = re.search(' \\| match "(.*)"', command)
+        if match:
+            lines = [line for line in lines if re.search(match.group(1), line, re.IGNORECASE)]
+        count = int(command.rsplit(" ", 1)[1])
+        return "\n".join(lines[-count:])
+
+
+def logLines(start, count, minute=0):
+    return ["Oct 19 10:%02d:%02d r1 rpd[100]: message %d" % (minute + (start + i) // 60, (start + i) % 60, start + i) for i in range(count)]
+
+
+class LogFollowerTest(unittest.TestCase):
+
+    def testFirstPollReadsWindowThenOnlyNewLines(self):
+        log = FakeLog(logLines(0, 50))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        self.assertEqual(len(follower.poll(log.fetch, NOW)), 10)
+
+        log.lines.extend(logLines(50, 5))
+        log.commands = []
+        records = follower.poll(log.fetch, NOW)
+        self.assertEqual([record.line for record in records], log.lines[-5:])
+        self.assertEqual(log.commands, ["show log messages | last 10"])
+        self.assertEqual(follower.poll(log.fetch, NOW), [])
+
+    def testWindowGrowsUntilPreviousLinesFound(self):
+        log = FakeLog(logLines(0, 10))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        log.lines.extend(logLines(10, 25))
+        log.commands = []
+        self.assertEqual(len(follower.poll(log.fetch, NOW)), 25)
+        self.assertEqual(log.commands, ["show log messages | last 10", "show log messages | last 40"])
+
+    def testRotationStopsAtLastTimestamp(self):
+        log = FakeLog(logLines(0, 30))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+
+        # The last polled lines were rotated away but older lines are still in the file
+        log.lines = logLines(0, 25) + logLines(100, 3, minute=30)
+        log.commands = []
+        records = follower.poll(log.fetch, NOW)
+        self.assertEqual([record.line for record in records], log.lines[-3:])
+        self.assertEqual(log.commands, ["show log messages | last 10"])
+
+    def testNewLinesInSameSecondAsLastRecord(self):
+        log = FakeLog(["Oct 19 10:00:00 r1 rpd[100]: old %d" % i for i in range(20)])
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        log.lines.extend("Oct 19 10:00:00 r1 rpd[100]: new %d" % i for i in range(15))
+        records = follower.poll(log.fetch, NOW)
+        self.assertEqual([record.line for record in records], log.lines[-15:])
+
+    def testRotationKeepsNewLinesInSameSecond(self):
+        log = FakeLog(logLines(0, 30))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        log.lines = logLines(0, 25) + logLines(29, 1) + ["Oct 19 10:00:29 r1 rpd[100]: same second"] + logLines(100, 2, minute=30)
+        records = follower.poll(log.fetch, NOW)
+        self.assertEqual([record.line for record in records], log.lines[-3:])
+
+    def testOutOfOrderLinesStaySorted(self):
+        log = FakeLog(["Oct 19 10:00:05 r1 a", "Oct 19 10:00:03 r1 b", "Oct 19 10:00:04 r1 c", "  detail"])
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        self.assertEqual(follower.timestamps, sorted(follower.timestamps))
+        log.lines.append("    more detail")
+        log.lines.append("Oct 19 10:00:06 r1 d")
+        follower.poll(log.fetch, NOW)
+        self.assertEqual([record.line for record in follower.search(datetime(2026, 10, 19, 10, 0, 3), datetime(2026, 10, 19, 10, 0, 4))],
+                         ["Oct 19 10:00:03 r1 b", "Oct 19 10:00:04 r1 c\n  detail\n    more detail"])
+
+    def testRotationToShortFileKeepsEveryLine(self):
+        log = FakeLog(logLines(0, 30))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        log.lines = logLines(200, 4, minute=30)
+        self.assertEqual(len(follower.poll(log.fetch, NOW)), 4)
+
+    def testLeadingContinuationJoinsLastCachedRecord(self):
+        log = FakeLog(logLines(0, 5))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=10)
+        follower.poll(log.fetch, NOW)
+        log.lines.extend(["    continued detail"] + logLines(5, 1))
+        records = follower.poll(log.fetch, NOW)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(follower.records[4].line, log.lines[4] + "\n    continued detail")
+
+    def testMatchWithDoubleQuote(self):
+        log = FakeLog(['Oct 19 10:00:00 r1 mgd[1]: UI_CMDLINE_READ_LINE: command "show version"',
+                       'Oct 19 10:00:01 r1 mgd[1]: UI_CMDLINE_READ_LINE: command xshow versionx'])
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, match='"show version"')
+        self.assertEqual(follower.command(5), 'show log messages | match ".show version." | last 5')
+        self.assertEqual([record.line for record in follower.poll(log.fetch, NOW)], log.lines[:1])
+
+    def testSearchByTimeRange(self):
+        log = FakeLog(logLines(0, 120))
+        follower = JunosLogs.LogFollower(TIMESTAMP_RE, window=200)
+        follower.poll(log.fetch, NOW)
+        records = follower.search(datetime(2026, 10, 19, 10, 0, 30), datetime(2026, 10, 19, 10, 1, 0))
+        self.assertEqual(len(records), 31)
+        self.assertEqual(len(follower.search(pattern="message 11\\d")), 10)
+
+
+class ParseLogLinesTest(unittest.TestCase):
+
+    def testYearRollover(self):
+        now = datetime(2027, 1, 1, 0, 5, 0)
+        records = JunosLogs.parseLogLines(["Dec 31 23:59:59 r1 a", "Jan  1 00:00:01 r1 b"], TIMESTAMP_RE, now)
+        self.assertEqual([record.timestamp for record in records], [datetime(2026, 12, 31, 23, 59, 59), datetime(2027, 1, 1, 0, 0, 1)])
+
+    def testContinuationLines(self):
+        records = JunosLogs.parseLogLines(["Oct 19 10:00:00 r1 a", "  more", "Oct 19 10:00:01 r1 b"], TIMESTAMP_RE, NOW)
+        self.assertEqual([record.line for record in records], ["Oct 19 10:00:00 r1 a\n  more", "Oct 19 10:00:01 r1 b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import JunosNetconf
+import JunosReplies
+from test_JunosReplies import RAW_LSPS
+
+
+class RecordingLog(object):
+    '''
+        Stands in for Robot's BuiltIn so keywords can be called without a Robot run.
+    '''
+
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message, level="INFO", console=False):
+        self.messages.append((level, message))
+
+    def errors(self):
+        return [message for level, message in self.messages if level == "ERROR"]
+
+
+class VerifyLspTest(unittest.TestCase):
+
+    def setUp(self):
+        self.builtIn = JunosNetconf.robot
+        JunosNetconf.robot = RecordingLog()
+        self.library = JunosNetconf.JunosNetconf()
+        self.reply = JunosReplies.parseReply(RAW_LSPS)
+
+    def tearDown(self):
+        JunosNetconf.robot = self.builtIn
+
+    def verify(self, lspName, **kwargs):
+        return self.library._verifyLsp("r1", self.reply, lspName, **kwargs)
+
+    def testHoldComparesHoldPriority(self):
+        # lsp1 has setup priority 7 and hold priority 0.  hold used to be compared with setup-priority, so hold="7"
+        # passed and hold="0" failed.
+        self.assertTrue(self.verify("lsp1", hold="0"))
+        self.assertFalse(self.verify("lsp1", hold="7"))
+        self.assertEqual(JunosNetconf.robot.errors(), ["LSP named lsp1 failed validation on PE r1: hold priority is 0, expected 7"])
+
+    def testExternallyControlledLspType(self):
+        # lspType used to test the lsp-control-status element rather than its text, so "external" never matched
+        self.assertTrue(self.verify("lsp1", lspType="external"))
+        self.assertFalse(self.verify("lsp1", lspType="local"))
+        self.assertEqual(JunosNetconf.robot.errors(), ["LSP named lsp1 failed validation on PE r1: lsp type is external, expected local"])
+
+    def testVerifiedValuesAreLogged(self):
+        self.assertTrue(self.verify("lsp1", bandwidth="10Mbps", setup="7", fastReroute="true"))
+        self.assertIn(("INFO", "\n### Verified LSP lsp1 setup priority set to 7"), JunosNetconf.robot.messages)
+        JunosNetconf.robot.messages = []
+        self.assertTrue(self.verify("lsp1", setup="7", log=False))
+        self.assertEqual([level for level, message in JunosNetconf.robot.messages], ["DEBUG"])
+
+    def testDownAndMissingLsps(self):
+        self.assertFalse(self.verify("lsp2"))
+        self.assertFalse(self.verify("lsp3"))
+        self.assertEqual(JunosNetconf.robot.errors(), ["LSP named lsp2 failed validation on PE r1: state is Dn",
+                                                       "LSP named lsp3 was not found on PE r1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+from lxml import etree
+
+import JunosNetconfBroker
+
+
+class FakeDev(object):
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeSession(object):
+    '''
+        Stands in for JunosNetconfUtils.JunosNetconf: xml ops return an element, text ops a string.
+    '''
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, host):
+        self.host = host
+        self.dev = FakeDev()
+
+    def op(self, op, obj=None, objParams=[], *args, **kwargs):
+        with FakeSession.lock:
+            FakeSession.active += 1
+            FakeSession.peak = max(FakeSession.peak, FakeSession.active)
+        try:
+            time.sleep(0.01)
+            if op == "xml":
+                root = etree.Element("route-information")
+                for index in range(kwargs.get("count", 1)):
+                    etree.SubElement(root, "rt").text = str(index)
+                return {"status_code": "success", "result": root}
+            return {"status_code": "success", "result": "output of " + str(obj)}
+        finally:
+            with FakeSession.lock:
+                FakeSession.active -= 1
+
+
+class FakeBroker(JunosNetconfBroker.Broker):
+
+    def __init__(self, maxSessions):
+        JunosNetconfBroker.Broker.__init__(self, maxSessions)
+        self.logins = 0
+
+    def _netconf(self, hostPool, key):
+        session = hostPool.acquire(key)
+        if session is None:
+            self.logins += 1
+            session = FakeSession(key[1])
+        return session
+
+
+class HostPoolTest(unittest.TestCase):
+
+    def testAcquireReleaseAbandon(self):
+        pool = JunosNetconfBroker._HostPool("r1", 2)
+        self.assertIsNone(pool.acquire("a"))
+        self.assertIsNone(pool.acquire("a"))
+        self.assertEqual(pool.opened, 2)
+        pool.abandon()
+        self.assertEqual(pool.opened, 1)
+
+        session = FakeSession("r1")
+        pool.release("a", session)
+        self.assertIs(pool.acquire("a"), session)
+        pool.release("a", session, broken=True)
+        self.assertEqual(pool.opened, 0)
+        self.assertTrue(session.dev.closed)
+
+    def testFullHostEvictsIdleSessionOfOtherCredentials(self):
+        pool = JunosNetconfBroker._HostPool("r1", 1)
+        self.assertIsNone(pool.acquire("a"))
+        session = FakeSession("r1")
+        pool.release("a", session)
+        self.assertIsNone(pool.acquire("b"))
+        self.assertEqual(pool.opened, 1)
+        self.assertTrue(session.dev.closed)
+        self.assertEqual(pool.idle["a"], [])
+
+    def testFullHostWaitsForRelease(self):
+        pool = JunosNetconfBroker._HostPool("r1", 1)
+        pool.acquire("a")
+        session = FakeSession("r1")
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire("a")))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(acquired, [])
+        pool.release("a", session)
+        waiter.join(5)
+        self.assertEqual(acquired, [session])
+        self.assertEqual(pool.opened, 1)
+
+
+class FrameTest(unittest.TestCase):
+
+    def testFrameRoundTrip(self):
+        left, right = socket.socketpair()
+        try:
+            payload = os.urandom(3 * JunosNetconfBroker.CHUNK_SIZE + 7)
+            sender = threading.Thread(target=lambda: [JunosNetconfBroker._sendFrame(left, payload), JunosNetconfBroker._sendFrame(left, b"")])
+            sender.start()
+            self.assertEqual(JunosNetconfBroker._recvFrame(right), payload)
+            self.assertEqual(JunosNetconfBroker._recvFrame(right), b"")
+            sender.join()
+            JunosNetconfBroker._sendMessage(left, {"status_code": "success", "result": u"r\u00e9sultat"})
+            self.assertEqual(JunosNetconfBroker._recvMessage(right), {"status_code": "success", "result": u"r\u00e9sultat"})
+            left.close()
+            self.assertIsNone(JunosNetconfBroker._recvFrame(right))
+        finally:
+            left.close()
+            right.close()
+
+
+class BrokerServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.socketPath = os.path.join(self.tempDir, "broker.sock")
+        self.server = JunosNetconfBroker.BrokerServer(self.socketPath, maxSessions=2)
+        self.server.broker = FakeBroker(2)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        FakeSession.peak = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tempDir)
+
+    def client(self, user="lab"):
+        client = JunosNetconfBroker.BrokerClient(self.socketPath, "r1")
+        client._authenticate(user, "secret")
+        return client
+
+    def testSocketIsOwnerOnly(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.socketPath).st_mode), 0o600)
+
+    def testStreamedXmlAndStringResults(self):
+        client = self.client()
+        try:
+            self.assertTrue(client.connected)
+            result = client.op("xml", "show route", count=20000)
+            self.assertEqual(result["status_code"], "success")
+            self.assertEqual(result["result"].tag, "route-information")
+            self.assertEqual(len(result["result"]), 20000)
+            self.assertEqual(client.op("text", "show version"), {"status_code": "success", "result": "output of show version"})
+            self.assertEqual(client.op("configure", objParams=["private"])["status_code"], "success")
+        finally:
+            client.dev.close()
+
+    def testSessionsPerHostStayWithinMax(self):
+        errors = []
+
+        def worker(index):
+            client = self.client("user" + str(index % 3))
+            try:
+                for count in range(5):
+                    if client.op("text", "show version")["status_code"] != "success":
+                        errors.append(index)
+            finally:
+                client.dev.close()
+
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join(30)
+        self.assertEqual(errors, [])
+        self.assertLessEqual(FakeSession.peak, 2)
+        self.assertLessEqual(self.server.broker._hosts["r1"].opened, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
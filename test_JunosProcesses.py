@@ -0,0 +1,89 @@
+import unittest
+
+import JunosProcesses
+
+
+PS_OUTPUT = '''  PID  TT  STAT       TIME COMMAND
+    0  -   DLs     0:00.80 [kernel]
+    1  -   ILs     0:00.25 /sbin/init --
+ 1234  -   S       1:23.45 /usr/sbin/rpd -N
+ 1240  -   S       0:01.00 /usr/sbin/rpd-agent
+ 1300  -   S       0:10.00 /usr/sbin/sshd: root@pts/0 (sshd)
+ 1301  -   S       0:10.00 /usr/sbin/sshd
+'''
+
+TOP_OUTPUT = '''last pid:  5678;  load averages:  0.10,  0.05,  0.01  up 10+01:02:03
+120 processes: 2 running, 117 sleeping, 1 zombie
+Mem: 500M Active, 100M Inact
+
+  PID USERNAME  THR PRI NICE   SIZE    RES STATE   C   TIME    WCPU COMMAND
+ 1234 root        1  20    0   100M 50000K kqread  0   1:23   0.50% rpd
+ 1240 root        1  20    0    10M  5000K select  0   0:23   0.00% rpd-agent
+ 1300 root        1  20    0    10M  5000K select  0   0:23   0.00% mib2d
+'''
+
+THREADED_TOP_OUTPUT = '''last pid:  5678;  load averages:  0.10,  0.05,  0.01  up 10+01:02:03
+
+  PID USERNAME PRI NICE   SIZE    RES STATE   C   TIME    WCPU COMMAND
+   11 root     155 ki31     0K    32K CPU0    0 500:00  98.00% idle{idle: cpu0}
+   11 root     155 ki31     0K    32K RUN     1 500:00  97.00% idle{idle: cpu1}
+ 1234 root      20    0   100M 50000K kqread  0   1:00   0.50% rpd{rpd}
+ 1234 root      20    0   100M 50000K uwait   1   0:23   0.25% rpd{TraceThread}
+ 1234 root      20    0   100M 50000K uwait   0   0:01   0.00% rpd{krtio-th}
+ 1240 root      20    0    10M  5000K select  0   0:23   0.00% rpd-agent{rpd-agent}
+'''
+
+
+class ProcessTableTest(unittest.TestCase):
+
+    def testPsLayout(self):
+        table = JunosProcesses.parseProcessTable(PS_OUTPUT)
+        self.assertEqual(len(table), 6)
+        self.assertEqual(table.byPid[1234].command, "/usr/sbin/rpd -N")
+        self.assertEqual(table.byPid[1234].state, "S")
+        self.assertIsNone(table.byPid[1234].cpu)
+        self.assertEqual([process.pid for process in table.find("rpd")], [1234])
+        self.assertEqual(len(table.find("kernel")), 1)
+        self.assertEqual(len(table.find("sshd")), 2)
+
+    def testTopLayout(self):
+        table = JunosProcesses.parseProcessTable(TOP_OUTPUT)
+        rpd = table.byPid[1234]
+        self.assertEqual(rpd.name, "rpd")
+        self.assertEqual(rpd.user, "root")
+        self.assertEqual(rpd.threads, 1)
+        self.assertEqual(rpd.cpu, 0.5)
+        self.assertEqual(rpd.size, 100 * 1024 ** 2)
+        self.assertEqual(rpd.resident, 50000 * 1024)
+        self.assertEqual(len(table.find("rpd*")), 2)
+
+    def testThreadRows(self):
+        table = JunosProcesses.parseProcessTable(THREADED_TOP_OUTPUT)
+        self.assertEqual(len(table.rows), 6)
+        self.assertEqual(len(table), 3)
+        self.assertEqual([process.pid for process in table.find("rpd")], [1234])
+        self.assertEqual(table.byPid[1234].threads, 3)
+        self.assertAlmostEqual(table.byPid[1234].cpu, 0.75)
+        self.assertEqual(table.byPid[11].name, "idle")
+        self.assertEqual(table.check(["rpd", "idle", "rpd>=2"]), ["process rpd has 1 running, expected at least 2"])
+
+    def testCommandLinePatterns(self):
+        table = JunosProcesses.parseProcessTable(PS_OUTPUT)
+        self.assertEqual([process.pid for process in table.find("/usr/sbin/rpd")], [1234])
+        self.assertEqual([process.pid for process in table.find("rpd -N")], [1234])
+        self.assertEqual([process.pid for process in table.find("/usr/sbin/rpd -N")], [1234])
+        self.assertEqual([process.pid for process in table.find("/usr/sbin/sshd")], [1300, 1301])
+        self.assertEqual([process.pid for process in table.find("/usr/sbin/rpd*")], [1234, 1240])
+        self.assertEqual(table.find("rpd -X"), [])
+        self.assertEqual(table.find("/sbin/rpd"), [])
+        self.assertEqual(table.check(["/usr/sbin/rpd", "sshd: root@pts/0"]), [])
+
+    def testCheckSpecs(self):
+        table = JunosProcesses.parseProcessTable(PS_OUTPUT)
+        self.assertEqual(table.check(["rpd", "sshd>=2", "rpd*>=2"]), [])
+        self.assertEqual(table.check(["dcd", "sshd >= 3"]), ["process dcd has 0 running, expected at least 1",
+                                                              "process sshd has 2 running, expected at least 3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
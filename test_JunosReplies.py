@@ -0,0 +1,74 @@
+import unittest
+
+from lxml import etree
+
+import JunosReplies
+
+
+RAW_LSPS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" xmlns:junos="http://xml.juniper.net/junos/18.1R1/junos">
+<mpls-lsp-information xmlns="http://xml.juniper.net/junos/18.1R1/junos-routing">
+<rsvp-session-data>
+<session-type>Ingress</session-type>
+<rsvp-session><mpls-lsp>
+<name>lsp1</name><lsp-state>Up</lsp-state>
+<lsp-type>
+Externally controlled
+</lsp-type>
+<lsp-control-status>Externally controlled</lsp-control-status>
+<is-fastreroute/>
+<mpls-lsp-path><bandwidth>10Mbps</bandwidth><setup-priority>7</setup-priority><hold-priority>0</hold-priority></mpls-lsp-path>
+</mpls-lsp></rsvp-session>
+<rsvp-session><mpls-lsp><name>lsp2</name><lsp-state>Dn</lsp-state><mpls-lsp-path/></mpls-lsp></rsvp-session>
+</rsvp-session-data>
+<rsvp-session-data>
+<session-type>Transit</session-type>
+<rsvp-session><name>lsp3</name><lsp-state>Up</lsp-state></rsvp-session>
+</rsvp-session-data>
+</mpls-lsp-information>
+</rpc-reply>'''
+
+
+class ParseReplyTest(unittest.TestCase):
+
+    def testRawReply(self):
+        root = JunosReplies.parseReply(RAW_LSPS)
+        self.assertEqual(root.tag, "mpls-lsp-information")
+        self.assertNotIn(b"xmlns", etree.tostring(root))
+        self.assertEqual(root.findtext("rsvp-session-data/rsvp-session/mpls-lsp/lsp-type"), "Externally controlled")
+        self.assertEqual(etree.tostring(JunosReplies.parseReply(RAW_LSPS.decode("utf-8"))), etree.tostring(root))
+
+    def testElementReply(self):
+        reply = etree.fromstring(b"<rpc-reply><route-information/></rpc-reply>")
+        self.assertEqual(JunosReplies.parseReply(reply).tag, "route-information")
+        self.assertEqual(JunosReplies.parseReply(reply[0]).tag, "route-information")
+
+
+class CheckLspTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lsps = JunosReplies.ingressLsps(JunosReplies.parseReply(RAW_LSPS))
+
+    def testIngressOnly(self):
+        self.assertEqual(sorted(self.lsps), ["lsp1", "lsp2"])
+
+    def testAllChecksMatch(self):
+        verified, failure = JunosReplies.checkLsp(self.lsps["lsp1"], bandwidth="10Mbps", setup="7", hold="0",
+                                                  fastReroute="true", lspType="external")
+        self.assertIsNone(failure)
+        self.assertEqual(verified, [("bandwidth", "10Mbps"), ("setup priority", "7"), ("hold priority", "0"),
+                                    ("fast reroute", "true"), ("lsp type", "external")])
+
+    def testFirstMismatchStops(self):
+        verified, failure = JunosReplies.checkLsp(self.lsps["lsp1"], setup="7", hold="7", lspType="local")
+        self.assertEqual(verified, [("setup priority", "7")])
+        self.assertEqual(failure, "hold priority is 0, expected 7")
+
+    def testDownLsp(self):
+        verified, failure = JunosReplies.checkLsp(self.lsps["lsp2"], bandwidth="0", fastReroute="false", lspType="local")
+        self.assertEqual(len(verified), 3)
+        self.assertEqual(failure, "state is Dn")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+import JunosReplyPool
+from test_JunosReplies import RAW_LSPS
+
+
+class ReplyPoolTest(unittest.TestCase):
+
+    def replyFiles(self):
+        return [name for name in os.listdir(JunosReplyPool.SHARED_DIR or tempfile.gettempdir()) if name.startswith("junos-reply-")]
+
+    def setUp(self):
+        self.before = set(self.replyFiles())
+
+    def assertNoReplyFiles(self, pool):
+        self.assertEqual(pool.paths, set())
+        self.assertEqual(set(self.replyFiles()) - self.before, set())
+
+    def testMapAndClose(self):
+        pool = JunosReplyPool.ReplyPool(2)
+        results = pool.map("lspCheck", [RAW_LSPS, RAW_LSPS.decode("utf-8")], lspNames=["lsp1", "lsp2", "lsp9"], hold="0")
+        self.assertEqual(results, [{"lsp1": None, "lsp2": "hold priority is None, expected 0", "lsp9": "not found"}] * 2)
+
+        snapshots = pool.map("snapshot", [RAW_LSPS] * 3, section="lsps")
+        self.assertEqual(sorted(snapshots[0]["Ingress"]["records"]), ["lsp1", "lsp2"])
+        self.assertEqual(snapshots[0], snapshots[2])
+
+        pool.submit("snapshot", RAW_LSPS, section="lsps")
+        pool.close()
+        self.assertNoReplyFiles(pool)
+
+    def testTerminateRemovesQueuedReplies(self):
+        pool = JunosReplyPool.ReplyPool(2)
+        for count in range(10):
+            pool.submit("lspCheck", RAW_LSPS, lspNames=["lsp1"])
+        pool.terminate()
+        self.assertNoReplyFiles(pool)
+
+    def testUnknownTask(self):
+        with JunosReplyPool.ReplyPool(1) as pool:
+            self.assertRaises(ValueError, pool.submit, "routeFrame", RAW_LSPS)
+        self.assertNoReplyFiles(pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
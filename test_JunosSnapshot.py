@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+import JunosSnapshot
+
+
+BGP_TEMPLATE = '''<bgp-information>
+    <bgp-peer><peer-address>10.0.0.1</peer-address><peer-state>{0}</peer-state><elapsed-time>{1}</elapsed-time></bgp-peer>
+    <bgp-peer><peer-address>10.0.0.2</peer-address><peer-state>Established</peer-state><elapsed-time>{1}</elapsed-time></bgp-peer>
+    {2}
+</bgp-information>'''
+
+EXTRA_PEER = '<bgp-peer><peer-address>10.0.0.3</peer-address><peer-state>Established</peer-state></bgp-peer>'
+
+ROUTES = b'''<route-information>
+    <route-table><table-name>inet.0</table-name>
+        <rt><rt-destination>10.1.0.0/16</rt-destination><rt-entry><protocol-name>BGP</protocol-name><age>1w</age></rt-entry></rt>
+    </route-table>
+    <route-table><table-name>inet.3</table-name>
+        <rt><rt-destination>192.0.2.1/32</rt-destination><rt-entry><protocol-name>RSVP</protocol-name><age>2d</age></rt-entry></rt>
+    </route-table>
+</route-information>'''
+
+
+def bgpReply(state="Established", elapsed="1w", extra=""):
+    return etree.fromstring(BGP_TEMPLATE.format(state, elapsed, extra).encode("utf-8"))
+
+
+class SnapshotDiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def snapshot(self, **kwargs):
+        snapshot = JunosSnapshot.Snapshot()
+        snapshot.add("r1", "bgpPeers", bgpReply(**kwargs))
+        snapshot.add("r1", "routes", etree.fromstring(ROUTES))
+        return snapshot
+
+    def testIdenticalIgnoresVolatileFields(self):
+        before = self.snapshot(elapsed="1w")
+        after = self.snapshot(elapsed="2w")
+        self.assertEqual(before.deviceHash("r1"), after.deviceHash("r1"))
+        self.assertEqual(list(JunosSnapshot.diffSnapshots(before, after)), [])
+
+    def testAddedRemovedChanged(self):
+        before = self.snapshot()
+        after = self.snapshot(state="Active", extra=EXTRA_PEER)
+        changes = sorted(JunosSnapshot.diffSnapshots(before, after), key=lambda change: change.key)
+        self.assertEqual([(change.key, change.change) for change in changes], [("10.0.0.1", "changed"), ("10.0.0.3", "added")])
+        self.assertEqual(JunosSnapshot.describeChange(changes[0]),
+                         "changed bgpPeers 10.0.0.1 on host r1: peer-state=Established -> peer-state=Active")
+
+        changes = list(JunosSnapshot.diffSnapshots(after, before))
+        self.assertIn(("10.0.0.3", "removed"), [(change.key, change.change) for change in changes])
+
+    def testUnchangedSectionsAndGroupsAreSkipped(self):
+        before = self.snapshot()
+        after = self.snapshot(state="Active")
+        self.assertEqual(before.sectionHash("r1", "routes"), after.sectionHash("r1", "routes"))
+        self.assertNotEqual(before.sectionHash("r1", "bgpPeers"), after.sectionHash("r1", "bgpPeers"))
+        self.assertEqual(set(change.section for change in JunosSnapshot.diffSnapshots(before, after)), set(["bgpPeers"]))
+
+    def testRecordsGroupedByTable(self):
+        snapshot = self.snapshot()
+        self.assertEqual(sorted(snapshot.devices["r1"]["routes"].keys()), ["inet.0", "inet.3"])
+
+    def testHashesSurviveSaveAndLoad(self):
+        before = self.snapshot()
+        path = os.path.join(self.tempDir, "before.json.gz")
+        before.save(path)
+        loaded = JunosSnapshot.Snapshot.load(path)
+        self.assertEqual(loaded.deviceHash("r1"), before.deviceHash("r1"))
+        self.assertEqual(loaded.deviceHash("r1"), self.snapshot().deviceHash("r1"))
+        self.assertEqual(list(JunosSnapshot.diffSnapshots(loaded, self.snapshot())), [])
+
+    def testHashOnlySnapshot(self):
+        before = JunosSnapshot.Snapshot(keepFields=False)
+        before.add("r1", "bgpPeers", bgpReply())
+        after = JunosSnapshot.Snapshot(keepFields=False)
+        after.add("r1", "bgpPeers", bgpReply(state="Idle"))
+        changes = list(JunosSnapshot.diffSnapshots(before, after))
+        self.assertEqual([(change.key, change.change, change.before) for change in changes], [("10.0.0.1", "changed", None)])
+
+
+if __name__ == '__main__':
+    unittest.main()